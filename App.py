@@ -1,13 +1,16 @@
 from PyQt6.QtWidgets import QApplication, QMainWindow
 from UI.MainLoginWindow import LoginMainWindowExt
+from Models.Telemetry import configure_logging, get_logger, telemetry
 
 def run_app():
+    configure_logging()
     app = QApplication([])
     mainwindow = QMainWindow()
     myui = LoginMainWindowExt()
     myui.setupUi(mainwindow)
     myui.showWindow()
     app.exec()
+    get_logger("app").info("Session timings:\n%s", telemetry.format_summary())
 
 # Gọi hàm để chạy ứng dụng
 if __name__ == "__main__":
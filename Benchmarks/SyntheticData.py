@@ -0,0 +1,199 @@
+import argparse
+import re
+import numpy as np
+import pandas as pd
+
+# Column order of the pizza_data table (see ingestdata.py)
+PIZZA_DATA_COLUMNS = ['order_id', 'pizza_id', 'quantity', 'order_date', 'order_time', 'unit_price', 'discount',
+                      'total_price', 'pizza_size', 'pizza_category', 'pizza_ingredients', 'pizza_name',
+                      'total_cost', 'is_holiday', 'time_period']
+
+# Default menu modelled on the raw pizza sales export: name, category code, ingredients, price of size S.
+DEFAULT_MENU = [
+    ("The Classic Deluxe Pizza", 1, "Pepperoni, Mushrooms, Red Onions, Red Peppers, Bacon", 12.00),
+    ("The Hawaiian Pizza", 1, "Sliced Ham, Pineapple, Mozzarella Cheese", 10.50),
+    ("The Pepperoni Pizza", 1, "Mozzarella Cheese, Pepperoni", 9.75),
+    ("The Big Meat Pizza", 1, "Bacon, Pepperoni, Italian Sausage, Chorizo Sausage", 12.00),
+    ("The Barbecue Chicken Pizza", 2, "Barbecued Chicken, Red Peppers, Green Peppers, Tomatoes, Red Onions, "
+                                      "Barbecue Sauce", 12.75),
+    ("The Thai Chicken Pizza", 2, "Chicken, Pineapple, Tomatoes, Red Peppers, Thai Sweet Chilli Sauce", 12.75),
+    ("The California Chicken Pizza", 2, "Chicken, Artichoke, Spinach, Garlic, Jalapeno Peppers, Fontina Cheese, "
+                                        "Gouda Cheese", 12.75),
+    ("The Spicy Italian Pizza", 3, "Capocollo, Tomatoes, Goat Cheese, Artichokes, Peperoncini verdi, Garlic", 12.50),
+    ("The Italian Supreme Pizza", 3, "Calabrese Salami, Capocollo, Tomatoes, Red Onions, Green Olives, Garlic",
+     12.50),
+    ("The Sicilian Pizza", 3, "Coarse Sicilian Salami, Tomatoes, Green Olives, Luganega Sausage, Onions, Garlic",
+     12.25),
+    ("The Four Cheese Pizza", 4, "Ricotta Cheese, Gorgonzola Piccante Cheese, Mozzarella Cheese, "
+                                 "Parmigiano Reggiano Cheese, Garlic", 11.75),
+    ("The Five Cheese Pizza", 4, "Mozzarella Cheese, Provolone Cheese, Smoked Gouda Cheese, Romano Cheese, "
+                                 "Blue Cheese, Garlic", 18.50),
+    ("The Vegetables + Vegetables Pizza", 4, "Mushrooms, Tomatoes, Red Peppers, Green Peppers, Red Onions, "
+                                             "Zucchini, Spinach, Garlic", 12.00),
+    ("The Mediterranean Pizza", 4, "Spinach, Artichokes, Kalamata Olives, Sun-dried Tomatoes, Feta Cheese, "
+                                   "Plum Tomatoes, Red Onions", 12.00),
+]
+MENU_POPULARITY = [0.075, 0.072, 0.070, 0.056, 0.074, 0.073, 0.070, 0.060, 0.058, 0.059, 0.058, 0.045, 0.055,
+                   0.045]
+# Size code -> (share of order lines, price increase over size S)
+SIZES = {1: (0.29, 0.00), 2: (0.32, 4.00), 3: (0.38, 8.00), 4: (0.008, 12.00), 5: (0.002, 16.00)}
+# Size code -> suffix of the menu code in pizza_id, e.g. "hawaiian_m"
+SIZE_SUFFIXES = {1: "s", 2: "m", 3: "l", 4: "xl", 5: "xxl"}
+QUANTITY_PROBS = {1: 0.981, 2: 0.0175, 3: 0.0012, 4: 0.0003}
+DISCOUNT_PROBS = {0.0: 0.80, 0.05: 0.08, 0.1: 0.08, 0.2: 0.04}
+# Orders per weekday (Monday first) and per opening hour
+WEEKDAY_WEIGHTS = [0.135, 0.135, 0.14, 0.15, 0.17, 0.15, 0.12]
+HOUR_WEIGHTS = {9: 0.001, 10: 0.002, 11: 0.06, 12: 0.12, 13: 0.11, 14: 0.06, 15: 0.06, 16: 0.08, 17: 0.11,
+                18: 0.11, 19: 0.09, 20: 0.08, 21: 0.06, 22: 0.04, 23: 0.027}
+HOLIDAYS = ["01-01", "01-19", "02-16", "05-25", "07-04", "09-07", "10-12", "11-11", "11-26", "12-25"]
+COST_RATIO = (0.30, 0.45)
+
+
+_TIME_STRINGS = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(24 * 3600)],
+                         dtype=object)
+
+
+def _pizza_id(name, size):
+    slug = re.sub(r"[^a-z0-9]+", "_", re.sub(r"^the | pizza$", "", name.lower())).strip("_")
+    return f"{slug}_{SIZE_SUFFIXES.get(size, size)}"
+
+
+def _time_period(hours):
+    # 1 = Morning, 2 = Afternoon, 4 = Evening (codes used by the prediction tab)
+    return np.where(hours < 12, 1, np.where(hours < 17, 2, 4))
+
+
+class SyntheticPizzaData:
+    def __init__(self, seed=42, start_date="2015-01-01", days=365, reference=None):
+        self.seed = seed
+        self.start_date = pd.Timestamp(start_date)
+        self.days = days
+        self.menu = self._menu_from_reference(reference) if reference is not None else self._default_menu()
+        self.quantity_probs = QUANTITY_PROBS
+        self.discount_probs = DISCOUNT_PROBS
+        if reference is not None:
+            self.quantity_probs = reference['quantity'].value_counts(normalize=True).to_dict()
+            self.discount_probs = reference['discount'].round(2).value_counts(normalize=True).to_dict()
+        dates = self.start_date + pd.to_timedelta(np.arange(days), unit="D")
+        holidays = set(HOLIDAYS)
+        self._day_weights = np.array([WEEKDAY_WEIGHTS[d.dayofweek] for d in dates])
+        self._day_weights /= self._day_weights.sum()
+        self._is_holiday = np.array([d.strftime("%m-%d") in holidays for d in dates], dtype=np.int8)
+
+    @staticmethod
+    def _default_menu():
+        rows = []
+        for (name, category, ingredients, base_price), popularity in zip(DEFAULT_MENU, MENU_POPULARITY):
+            for size, (share, extra) in SIZES.items():
+                rows.append({"pizza_id": _pizza_id(name, size), "pizza_name": name, "pizza_category": category,
+                             "pizza_size": size, "pizza_ingredients": ingredients, "unit_price": base_price + extra,
+                             "weight": popularity * share})
+        menu = pd.DataFrame(rows)
+        menu["weight"] /= menu["weight"].sum()
+        return menu
+
+    @staticmethod
+    def _menu_from_reference(reference):
+        # Empirical menu: every (name, size) seen in the reference data, weighted by its share of lines
+        menu = reference.groupby(['pizza_name', 'pizza_size']).agg(
+            pizza_id=('pizza_id', 'first'),
+            pizza_category=('pizza_category', 'first'),
+            pizza_ingredients=('pizza_ingredients', 'first'),
+            unit_price=('unit_price', 'median'),
+            weight=('quantity', 'size'),
+        ).reset_index()
+        if not pd.api.types.is_string_dtype(menu["pizza_id"]):
+            menu["pizza_id"] = [_pizza_id(name, size) for name, size in zip(menu["pizza_name"], menu["pizza_size"])]
+        menu["weight"] /= menu["weight"].sum()
+        return menu
+
+    def chunks(self, n_rows, chunk_size=1_000_000):
+        # Yields DataFrames in order_date order; chunk k covers the k-th slice of the calendar
+        rng = np.random.default_rng(self.seed)
+        n_chunks = max(1, -(-n_rows // chunk_size))
+        day_bounds = np.linspace(0, self.days, n_chunks + 1).round().astype(int)
+        order_id = 1
+        for k in range(n_chunks):
+            rows = min(chunk_size, n_rows - k * chunk_size)
+            lo = min(day_bounds[k], self.days - 1)
+            hi = min(max(day_bounds[k + 1], lo + 1), self.days)
+            chunk = self._make_chunk(rng, rows, lo, hi, order_id)
+            order_id = int(chunk['order_id'].iloc[-1]) + 1
+            yield chunk
+
+    def generate(self, n_rows, chunk_size=1_000_000):
+        return pd.concat(self.chunks(n_rows, chunk_size), ignore_index=True)
+
+    def write_csv(self, path, n_rows, chunk_size=1_000_000):
+        for i, chunk in enumerate(self.chunks(n_rows, chunk_size)):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+    def _make_chunk(self, rng, rows, day_lo, day_hi, first_order_id):
+        # Order lines: every order has 1 + Poisson(1.3) lines sharing its date and time
+        lines_per_order = 1 + rng.poisson(1.3, size=rows)
+        order_of_line = np.repeat(np.arange(rows), lines_per_order)[:rows]
+        n_orders = order_of_line[-1] + 1
+
+        day_weights = self._day_weights[day_lo:day_hi] / self._day_weights[day_lo:day_hi].sum()
+        order_days = np.sort(rng.choice(np.arange(day_lo, day_hi), size=n_orders, p=day_weights))
+        hours = np.array(list(HOUR_WEIGHTS))
+        hour_p = np.array(list(HOUR_WEIGHTS.values()))
+        order_hours = rng.choice(hours, size=n_orders, p=hour_p / hour_p.sum())
+        order_seconds = order_hours * 3600 + rng.integers(0, 3600, size=n_orders)
+        # Keep lines sorted by date and time within the chunk
+        order_rank = np.lexsort((order_seconds, order_days))
+        order_days, order_seconds, order_hours = order_days[order_rank], order_seconds[order_rank], \
+            order_hours[order_rank]
+
+        day = order_days[order_of_line]
+        seconds = order_seconds[order_of_line]
+        menu_idx = rng.choice(len(self.menu), size=rows, p=self.menu["weight"].to_numpy())
+        quantity = rng.choice(list(self.quantity_probs), size=rows, p=self._normalized(self.quantity_probs))
+        discount = rng.choice(list(self.discount_probs), size=rows, p=self._normalized(self.discount_probs))
+        unit_price = self.menu["unit_price"].to_numpy()[menu_idx]
+        total_price = np.round(unit_price * quantity * (1 - discount), 2)
+        total_cost = np.round(total_price * rng.uniform(*COST_RATIO, size=rows), 2)
+
+        order_date = self.start_date + pd.to_timedelta(day, unit="D")
+        order_time = _TIME_STRINGS[seconds]
+        return pd.DataFrame({
+            'order_id': first_order_id + order_of_line,
+            'pizza_id': self.menu["pizza_id"].to_numpy()[menu_idx],
+            'quantity': quantity,
+            'order_date': order_date,
+            'order_time': order_time,
+            'unit_price': unit_price,
+            'discount': discount,
+            'total_price': total_price,
+            'pizza_size': self.menu["pizza_size"].to_numpy()[menu_idx],
+            'pizza_category': self.menu["pizza_category"].to_numpy()[menu_idx],
+            'pizza_ingredients': self.menu["pizza_ingredients"].to_numpy()[menu_idx],
+            'pizza_name': self.menu["pizza_name"].to_numpy()[menu_idx],
+            'total_cost': total_cost,
+            'is_holiday': self._is_holiday[day],
+            'time_period': _time_period(order_hours[order_of_line]),
+        })[PIZZA_DATA_COLUMNS]
+
+    @staticmethod
+    def _normalized(probs):
+        p = np.array(list(probs.values()), dtype=float)
+        return p / p.sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic pizza_data rows.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--output", required=True, help="CSV file to write.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--reference", help="CSV (e.g. ./Data/Pizza_Cleaned.csv) to copy menu and distributions from.")
+    args = parser.parse_args()
+
+    reference = pd.read_csv(args.reference) if args.reference else None
+    SyntheticPizzaData(seed=args.seed, days=args.days, reference=reference).write_csv(
+        args.output, args.rows, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
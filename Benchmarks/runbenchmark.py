@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from Benchmarks.SyntheticData import SyntheticPizzaData
+from Models.Statistic import Statistic
+from Models.Telemetry import configure_logging, get_logger, telemetry
+
+# Times the load -> statistics -> train -> predict path on synthetic data, e.g.:
+#   python -m Benchmarks.runbenchmark --rows 100000 1000000 --output Benchmarks/results/current.json
+#   python -m Benchmarks.runbenchmark --rows 100000 --compare Benchmarks/results/baseline.json
+
+logger = get_logger("benchmark")
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class FrameStatistic(Statistic):
+    # Statistic fed from an in-memory frame instead of MySQL, so load_data's pandas work is measured alone
+    def __init__(self, source_df):
+        self._source_df = source_df
+        super().__init__(autoload=False, backend="sqlite", path=":memory:")
+        self.load()
+
+    def connect(self):
+        return None
+
+    def queryDataset(self, sql, params=None):
+        return self._source_df.copy()
+
+    def queryTypedDataset(self, sql, schema, params=None):
+        return self._source_df[list(schema)].astype(schema)
+
+
+class PeakMemory:
+    # Samples the process RSS in a background thread; without psutil only the
+    # lifetime peak (ru_maxrss) is available, which never goes down between stages.
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current():
+        if psutil is not None:
+            return psutil.Process().memory_info().rss
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if platform.system() == "Darwin" else maxrss * 1024
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def run_stage(results, name, func):
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        extra = func() or {}
+        seconds = time.perf_counter() - start
+    results[name] = dict(seconds=seconds, peak_rss_mb=memory.peak / 2 ** 20, **extra)
+    logger.info(f"{name}: {seconds:.3f}s, peak RSS {memory.peak / 2 ** 20:.0f} MB")
+
+
+def benchmark_size(rows, args):
+    stages = {}
+    state = {}
+    rng = np.random.default_rng(args.seed)
+
+    def generate():
+        state["df"] = SyntheticPizzaData(seed=args.seed).generate(rows)
+
+    def load_data():
+        state["statistic"] = FrameStatistic(state.pop("df"))
+
+    def data_in_range():
+        statistic = state["statistic"]
+        products = statistic.df["pizza_name"].unique()
+        first, last = statistic.df["order_date"].min(), statistic.df["order_date"].max()
+        span_days = max(1, (last - first).days - 30)
+        durations = []
+        for _ in range(args.range_queries):
+            start = first + pd.Timedelta(days=int(rng.integers(0, span_days)))
+            t = time.perf_counter()
+            statistic.get_data_in_range(rng.choice(products), start, start + pd.Timedelta(days=30))
+            durations.append(time.perf_counter() - t)
+        return {"calls": len(durations), "p50_ms": float(np.median(durations) * 1000)}
+
+    def train():
+        statistic = state["statistic"]
+        df = statistic.df
+        if args.max_train_rows and len(df) > args.max_train_rows:
+            df = df.sample(args.max_train_rows, random_state=args.seed)
+        ok = statistic.model.train_model(df, size_preset=args.size_preset,
+                                         params={"n_estimators": args.n_estimators, "n_jobs": args.n_jobs})
+        if not ok:
+            raise RuntimeError("train_model failed")
+        return {"train_rows": len(df), "footprint_bytes": statistic.model.model_footprint()["compact_total_bytes"]}
+
+    def predict():
+        model = state["statistic"].model
+        entry = model.product_catalog[0]
+        call = (entry["pizza_name"], "Evening", False, entry["pizza_category"], entry["pizza_size"],
+                entry["unit_price"], 0.0)
+        timings = {}
+        for label, from_date, to_date in (("single_day", "2016-01-01", "2016-01-01"),
+                                          ("full_year", "2016-01-01", "2016-12-31")):
+            cold, warm = [], []
+            for _ in range(args.predict_repeats):
+                model.prediction_cache.clear()
+                t = time.perf_counter()
+                model.predict_quantity(*call, from_date, to_date)
+                cold.append(time.perf_counter() - t)
+                t = time.perf_counter()
+                model.predict_quantity(*call, from_date, to_date)
+                warm.append(time.perf_counter() - t)
+            timings[f"{label}_cold_p50_ms"] = float(np.median(cold) * 1000)
+            timings[f"{label}_warm_p50_ms"] = float(np.median(warm) * 1000)
+        return timings
+
+    stage_funcs = {"generate": generate, "load_data": load_data, "get_data_in_range": data_in_range,
+                   "train_model": train, "predict_quantity": predict}
+    for name, func in stage_funcs.items():
+        if name in ("generate", "load_data") or name in args.stages:
+            run_stage(stages, name, func)
+    return {"rows": rows, "stages": stages}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old_runs = {run["rows"]: run for run in baseline["runs"]}
+    print(f"{'rows':>12} {'stage':<20} {'baseline s':>11} {'current s':>10} {'speedup':>8}")
+    for run in current["runs"]:
+        old = old_runs.get(run["rows"])
+        if old is None:
+            continue
+        for stage, result in run["stages"].items():
+            if stage not in old["stages"]:
+                continue
+            before, after = old["stages"][stage]["seconds"], result["seconds"]
+            print(f"{run['rows']:>12} {stage:<20} {before:>11.3f} {after:>10.3f} {before / after:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Statistic and PredictionModel on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--stages", nargs="+", default=["get_data_in_range", "train_model", "predict_quantity"],
+                        help="Stages after generate/load_data to run.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=None, help="Threads used by the forest fit.")
+    parser.add_argument("--size-preset", default="full")
+    parser.add_argument("--max-train-rows", type=int, default=None, help="Subsample rows used for training.")
+    parser.add_argument("--range-queries", type=int, default=20)
+    parser.add_argument("--predict-repeats", type=int, default=20)
+    parser.add_argument("--output", default=None, help="JSON results file (default: Benchmarks/results/).")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+    configure_logging(os.environ.get("PIZZA_LOG_LEVEL", "WARNING"))
+    logger.setLevel("INFO")
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__,
+            "rss_source": "psutil" if psutil is not None else "ru_maxrss",
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "runs": [benchmark_size(rows, args) for rows in args.rows],
+        "timings": telemetry.summary(),
+    }
+
+    output = args.output or os.path.join("Benchmarks", "results", f"bench-{(commit or 'nogit')[:8]}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
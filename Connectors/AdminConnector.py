@@ -1,19 +1,19 @@
 from Connectors.Connector import Connector
 from Models.Admin import Admin
+from Models.Telemetry import span
 
 class AdminConnector(Connector):
     def sign_in(self, username, password):
         if self.conn is None:
             self.connect()
 
-        cursor = self.conn.cursor()
         sql = "SELECT * FROM admin WHERE AdminAccount=%s AND AdminPassword=%s"
         val = (username, password)
-        cursor.execute(sql, val)
-        dataset = cursor.fetchone()
+        with span("db.sign_in"):
+            dataset = self.fetchone(sql, val)
         ad = None
         if dataset is not None:
-            # Vì dùng DictCursor, dataset là một dict chứ không phải tuple
+            # Mọi backend trả về một dict chứ không phải tuple
             ad = Admin(
                 dataset["AdminID"],
                 dataset["AdminFullName"],
@@ -21,5 +21,4 @@ class AdminConnector(Connector):
                 dataset["AdminPassword"],
                 dataset["AdminPhone"]
             )
-        cursor.close()
         return ad
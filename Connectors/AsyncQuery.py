@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+
+from Models.Telemetry import get_logger
+
+logger = get_logger("db.async")
+
+
+class QueryHandle:
+    # Wraps the Future of one background query; cancel() also interrupts a query that is already running
+    def __init__(self, runner, timeout):
+        self.runner = runner
+        self.timeout = timeout
+        self.future = None
+        self.cancelled = False
+        self.expired = False
+        self._timer = None
+
+    def cancel(self):
+        self.cancelled = True
+        if not self.future.cancel():
+            self.runner.interrupt()
+
+    def _expire(self):
+        if not self.future.done():
+            logger.warning(f"Query did not finish within {self.timeout}s; interrupting it.")
+            self.expired = True
+            self.runner.interrupt()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def add_done_callback(self, fn):
+        self.future.add_done_callback(lambda _: fn(self))
+
+
+class AsyncQueryRunner:
+    # Runs work against one Connector off the calling thread. A single worker keeps
+    # the connection used by one thread at a time, as pymysql requires.
+    def __init__(self, connector, max_workers=1):
+        self.connector = connector
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-query")
+
+    def submit(self, fn, *args, timeout=None, **kwargs):
+        handle = QueryHandle(self, timeout)
+
+        def run():
+            # An interrupted query comes back as None or surfaces as an error further up
+            # (e.g. load_data's ValueError); either way report why it was interrupted
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if handle.expired:
+                    raise TimeoutError(f"Query timed out after {timeout}s") from e
+                if handle.cancelled:
+                    raise CancelledError() from e
+                raise
+            if handle.expired:
+                raise TimeoutError(f"Query timed out after {timeout}s")
+            if handle.cancelled:
+                raise CancelledError()
+            return result
+
+        handle.future = self._executor.submit(run)
+        if timeout:
+            handle._timer = threading.Timer(timeout, handle._expire)
+            handle._timer.daemon = True
+            handle._timer.start()
+            handle.future.add_done_callback(lambda _: handle._timer.cancel())
+        return handle
+
+    def interrupt(self):
+        try:
+            self.connector.interrupt()
+        except Exception as e:
+            logger.error(f"Could not interrupt query: {e}")
+
+    def shutdown(self, cancel=True):
+        self._executor.shutdown(wait=False, cancel_futures=cancel)
@@ -0,0 +1,345 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Column name -> SQL type of the pizza_data table, shared by every backend
+PIZZA_DATA_SCHEMA = [
+    ("order_id", "INT"),
+    ("pizza_id", "VARCHAR(255)"),
+    ("quantity", "INT"),
+    ("order_date", "DATE"),
+    ("order_time", "TIME"),
+    ("unit_price", "FLOAT"),
+    ("discount", "FLOAT"),
+    ("total_price", "FLOAT"),
+    ("pizza_size", "INT"),
+    ("pizza_category", "INT"),
+    ("pizza_ingredients", "TEXT"),
+    ("pizza_name", "VARCHAR(255)"),
+    ("total_cost", "FLOAT"),
+    ("is_holiday", "INT"),
+    ("time_period", "INT"),
+]
+ADMIN_SCHEMA = [
+    ("AdminID", "INT"),
+    ("AdminFullName", "VARCHAR(255)"),
+    ("AdminAccount", "VARCHAR(255)"),
+    ("AdminPassword", "VARCHAR(255)"),
+    ("AdminPhone", "VARCHAR(50)"),
+]
+# Normalized layout: one row per menu item in `pizza`, order lines in `pizza_sales`
+# reference it by a 2-byte key and keep money as integer cents. pizza_id is the
+# menu code (e.g. "hawaiian_m"), so it lives in the dimension.
+PIZZA_SCHEMA = [
+    ("pizza_key", "SMALLINT"),
+    ("pizza_id", "VARCHAR(255)"),
+    ("pizza_name", "VARCHAR(255)"),
+    ("pizza_category", "TINYINT"),
+    ("pizza_size", "TINYINT"),
+    ("pizza_ingredients", "TEXT"),
+]
+PIZZA_SALES_SCHEMA = [
+    ("order_id", "INT"),
+    ("pizza_key", "SMALLINT"),
+    ("quantity", "SMALLINT"),
+    ("order_date", "DATE"),
+    ("order_time", "TIME"),
+    ("unit_price_cents", "INT"),
+    ("discount_bp", "SMALLINT"),
+    ("total_price_cents", "INT"),
+    ("total_cost_cents", "INT"),
+    ("is_holiday", "TINYINT"),
+    ("time_period", "TINYINT"),
+]
+TABLE_SCHEMAS = {"pizza_data": PIZZA_DATA_SCHEMA, "admin": ADMIN_SCHEMA, "pizza": PIZZA_SCHEMA,
+                 "pizza_sales": PIZZA_SALES_SCHEMA}
+
+# SQL type -> NumPy dtype used by the typed fetch path; anything else stays object
+NUMPY_TYPES = {"TINYINT": np.int8, "SMALLINT": np.int16, "INT": np.int64, "FLOAT": np.float64,
+               "DOUBLE": np.float64, "DATE": "datetime64[ns]"}
+
+DEFAULT_PATHS = {"sqlite": "./Data/pizzamanager.db", "duckdb": "./Data/pizzamanager.duckdb"}
+# Rows per chunk when a result is streamed instead of fetched whole
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def create_table_sql(table_name, type_map=None):
+    type_map = type_map or {}
+    columns = ",\n    ".join(f"{name} {type_map.get(sql_type, sql_type)}"
+                               for name, sql_type in TABLE_SCHEMAS[table_name])
+    return f"CREATE TABLE IF NOT EXISTS {table_name} (\n    {columns}\n);"
+
+
+def numpy_schema(table_name):
+    return {name: np.dtype(NUMPY_TYPES.get(sql_type, object)) for name, sql_type in TABLE_SCHEMAS[table_name]}
+
+
+def select_sql(table_name, schema):
+    return f"SELECT {', '.join(schema)} FROM {table_name}"
+
+
+def _decode_column(values, dtype, count):
+    try:
+        return np.fromiter(values, dtype=dtype, count=count)
+    except (TypeError, ValueError):
+        # NULLs or unparseable values: let pandas coerce them (ints become float with NaN)
+        column = pd.Series(list(values), dtype=object)
+        if dtype.kind == "M":
+            return pd.to_datetime(column, errors="coerce").to_numpy(dtype)
+        return pd.to_numeric(column, errors="coerce").to_numpy()
+
+
+def decode_rows(rows, schema):
+    # rows are tuples in schema order; each column goes into one preallocated array
+    count = len(rows)
+    arrays = {}
+    for i, (name, dtype) in enumerate(schema.items()):
+        values = (row[i] for row in rows)
+        if dtype == object:
+            arrays[name] = np.fromiter(values, dtype=object, count=count)
+        else:
+            arrays[name] = _decode_column(values, dtype, count)
+    return arrays
+
+
+class MySQLBackend:
+    name = "mysql"
+    type_map = {}
+
+    def __init__(self, server=None, port=None, database=None, username=None, password=None, **kwargs):
+        import pymysql
+        self._pymysql = pymysql
+        self.errors = (pymysql.MySQLError,)
+        self.server = server or 'localhost'
+        self.port = port or 3306
+        self.database = database or 'pizzamanager'
+        self.username = username or 'root'
+        self.password = password or '123456'
+        self.conn = None
+
+    def connect(self):
+        self.conn = self._pymysql.connect(
+            host=self.server,
+            port=self.port,
+            user=self.username,
+            password=self.password,
+            database=self.database,
+            cursorclass=self._pymysql.cursors.DictCursor  # Trả về dictionary giống mysql.connector
+        )
+        return self.conn.cursor()
+
+    def fetchall(self, sql, params=None):
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return list(cursor.fetchall())
+
+    def fetch_frame(self, sql, params=None):
+        return pd.DataFrame(self.fetchall(sql, params))
+
+    def fetch_arrays(self, sql, schema, params=None):
+        # Plain tuple cursor: no per-row dicts, Decimal/date objects are converted per column
+        with self.conn.cursor(self._pymysql.cursors.Cursor) as cursor:
+            cursor.execute(sql, params)
+            return decode_rows(cursor.fetchall(), schema)
+
+    def iter_arrays(self, sql, schema, params=None, chunk_size=DEFAULT_CHUNK_ROWS):
+        # Unbuffered cursor: rows stay on the server until fetched, one chunk at a time
+        with self.conn.cursor(self._pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(sql, params)
+            while rows := cursor.fetchmany(chunk_size):
+                yield decode_rows(rows, schema)
+
+    def execute(self, sql, params=None):
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+        self.conn.commit()
+
+    def load_frame(self, table_name, df):
+        columns = ", ".join(df.columns)
+        placeholders = ", ".join(["%s"] * len(df.columns))
+        with self.conn.cursor() as cursor:
+            cursor.executemany(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
+                               list(df.itertuples(index=False, name=None)))
+        self.conn.commit()
+
+    def interrupt(self):
+        # KILL QUERY has to come from a second connection
+        if self.conn is None:
+            return
+        killer = self._pymysql.connect(host=self.server, port=self.port, user=self.username,
+                                       password=self.password, database=self.database)
+        try:
+            with killer.cursor() as cursor:
+                cursor.execute("KILL QUERY %s", (self.conn.thread_id(),))
+        finally:
+            killer.close()
+
+    def create_table(self, table_name):
+        self.execute(create_table_sql(table_name, self.type_map))
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+class SQLiteBackend:
+    # Embedded file database; statements written for MySQL (%s placeholders) run unchanged
+    name = "sqlite"
+    type_map = {}
+    errors = (sqlite3.Error, pd.errors.DatabaseError)
+
+    def __init__(self, path=None, **kwargs):
+        self.path = path or DEFAULT_PATHS[self.name]
+        self.conn = None
+
+    @staticmethod
+    def _translate(sql):
+        return sql.replace("%s", "?")
+
+    def connect(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        return self.conn.cursor()
+
+    def fetchall(self, sql, params=None):
+        rows = self.conn.execute(self._translate(sql), params or ()).fetchall()
+        return [dict(row) for row in rows]
+
+    def fetch_frame(self, sql, params=None):
+        return pd.read_sql_query(self._translate(sql), self.conn, params=params)
+
+    def fetch_arrays(self, sql, schema, params=None):
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        try:
+            return decode_rows(cursor.execute(self._translate(sql), params or ()).fetchall(), schema)
+        finally:
+            cursor.close()
+
+    def iter_arrays(self, sql, schema, params=None, chunk_size=DEFAULT_CHUNK_ROWS):
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        try:
+            cursor.execute(self._translate(sql), params or ())
+            while rows := cursor.fetchmany(chunk_size):
+                yield decode_rows(rows, schema)
+        finally:
+            cursor.close()
+
+    def execute(self, sql, params=None):
+        self.conn.execute(self._translate(sql), params or ())
+        self.conn.commit()
+
+    def load_frame(self, table_name, df):
+        # DATE/TIME columns are stored as ISO text, the same strings MySQL accepts
+        columns = ", ".join(df.columns)
+        placeholders = ", ".join(["?"] * len(df.columns))
+        self.conn.executemany(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
+                              df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+        self.conn.commit()
+
+    def interrupt(self):
+        if self.conn is not None:
+            self.conn.interrupt()
+
+    def create_table(self, table_name):
+        self.execute(create_table_sql(table_name, self.type_map))
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+class DuckDBBackend(SQLiteBackend):
+    # Columnar in-process engine: range filters and aggregates over pizza_data run vectorized
+    name = "duckdb"
+    # DuckDB's FLOAT is 4 bytes and would show rounding noise in revenue sums
+    type_map = {"FLOAT": "DOUBLE"}
+
+    def __init__(self, path=None, **kwargs):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("The duckdb backend requires duckdb (pip install duckdb).")
+        self._duckdb = duckdb
+        self.errors = (duckdb.Error,)
+        super().__init__(path, **kwargs)
+
+    def connect(self):
+        self.conn = self._duckdb.connect(self.path)
+        return self.conn
+
+    def fetchall(self, sql, params=None):
+        cursor = self.conn.execute(self._translate(sql), params)
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def fetch_frame(self, sql, params=None):
+        return self.conn.execute(self._translate(sql), params).df()
+
+    def fetch_arrays(self, sql, schema, params=None):
+        # Columnar result straight from DuckDB, only cast where the dtype differs
+        columns = self.conn.execute(self._translate(sql), params).fetchnumpy()
+        return {name: self._cast_column(columns[name], dtype) for name, dtype in schema.items()}
+
+    def iter_arrays(self, sql, schema, params=None, chunk_size=DEFAULT_CHUNK_ROWS):
+        # DuckDB hands results out in vectors of 2048 rows; a chunk is a whole number of them.
+        # A cursor keeps the stream independent of other statements on the connection.
+        cursor = self.conn.cursor()
+        try:
+            result = cursor.execute(self._translate(sql), params)
+            while len(chunk := result.fetch_df_chunk(max(1, chunk_size // 2048))):
+                yield {name: self._chunk_column(chunk[name], dtype) for name, dtype in schema.items()}
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _chunk_column(column, dtype):
+        try:
+            return column.to_numpy(dtype=dtype)
+        except (TypeError, ValueError):
+            # NULLs in an integer column: keep pandas' float with NaN
+            return column.to_numpy()
+
+    @staticmethod
+    def _cast_column(column, dtype):
+        if isinstance(column, np.ma.MaskedArray):
+            # Columns with NULLs; integer columns become float with NaN like pandas does
+            if dtype.kind in "iuf":
+                return column.astype(np.float64).filled(np.nan)
+            if dtype.kind == "M":
+                return column.astype(dtype).filled(np.datetime64("NaT"))
+            return column.astype(object).filled(None)
+        return column if column.dtype == dtype else column.astype(dtype)
+
+    def execute(self, sql, params=None):
+        self.conn.execute(self._translate(sql), params)
+
+    def load_frame(self, table_name, df):
+        # Bulk insert straight from the DataFrame; columns are cast to the table's types
+        types = {name: self.type_map.get(t, t) for name, t in TABLE_SCHEMAS.get(table_name, [])}
+        select = ", ".join(f"CAST({col} AS {types[col]})" if col in types else col for col in df.columns)
+        self.conn.register("incoming_frame", df)
+        try:
+            self.conn.execute(f"INSERT INTO {table_name} ({', '.join(df.columns)}) "
+                              f"SELECT {select} FROM incoming_frame")
+        finally:
+            self.conn.unregister("incoming_frame")
+
+
+BACKENDS = {backend.name: backend for backend in (MySQLBackend, SQLiteBackend, DuckDBBackend)}
+
+
+def create_backend(name=None, **kwargs):
+    # Backend comes from the argument, then PIZZA_DB_BACKEND, then MySQL;
+    # PIZZA_DB_PATH points the embedded backends at their database file
+    name = (name or os.environ.get("PIZZA_DB_BACKEND", "mysql")).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown database backend '{name}'. Choose from {sorted(BACKENDS)}.")
+    if name != "mysql" and not kwargs.get("path"):
+        kwargs["path"] = os.environ.get("PIZZA_DB_PATH")
+    return BACKENDS[name](**kwargs)
@@ -1,50 +1,74 @@
-import pymysql
 import pandas as pd
+from Connectors.Backend import create_backend
+from Models.Telemetry import get_logger, span
+
+logger = get_logger("db")
 
 class Connector:
-    def __init__(self, server=None, port=None, database=None, username=None, password=None):
-        self.server = server or 'localhost'
-        self.port = port or 3306
-        self.database = database or 'pizzamanager'
-        self.username = username or 'root'
-        self.password = password or '123456'
+    def __init__(self, server=None, port=None, database=None, username=None, password=None, backend=None,
+                 path=None):
+        # backend: "mysql" (default), "sqlite" or "duckdb"; see Connectors/Backend.py
+        self.backend = create_backend(backend, server=server, port=port, database=database, username=username,
+                                      password=password, path=path)
         self.conn = None
         self.cursor = None
 
     def connect(self):
         try:
-            self.conn = pymysql.connect(
-                host=self.server,
-                port=self.port,
-                user=self.username,
-                password=self.password,
-                database=self.database,
-                cursorclass=pymysql.cursors.DictCursor  # Trả về dictionary giống mysql.connector
-            )
-            self.cursor = self.conn.cursor()
-            print("Successfully connected to MySQL database")
+            with span("db.connect"):
+                self.cursor = self.backend.connect()
+            self.conn = self.backend.conn
+            logger.info(f"Successfully connected to {self.backend.name} database")
             return self.cursor
-        except pymysql.MySQLError as e:
-            print(f"Error connecting to MySQL: {e}")
+        except self.backend.errors as e:
+            logger.error(f"Error connecting to {self.backend.name}: {e}")
+            return None
+
+    def queryDataset(self, sql, params=None):
+        try:
+            with span("db.query"):
+                df = self.backend.fetch_frame(sql, params)
+            if not df.empty:
+                return df
+            return None
+        except self.backend.errors as e:
+            logger.error(f"Error executing query: {e}")
             return None
 
-    def queryDataset(self, sql):
+    def queryTypedDataset(self, sql, schema, params=None):
+        # schema: {column: numpy dtype} in the SELECT's column order (see Backend.numpy_schema)
         try:
-            self.cursor.execute(sql)
-            result = self.cursor.fetchall()
-            if result:
-                return pd.DataFrame(result)
+            with span("db.query_typed"):
+                arrays = self.backend.fetch_arrays(sql, schema, params)
+            if len(next(iter(arrays.values()), ())):
+                return pd.DataFrame(arrays, copy=False)
             return None
-        except pymysql.MySQLError as e:
-            print(f"Error executing query: {e}")
+        except self.backend.errors as e:
+            logger.error(f"Error executing query: {e}")
             return None
 
+    def iterTypedDataset(self, sql, schema, params=None, chunk_size=None):
+        # Like queryTypedDataset, but yields DataFrames of at most chunk_size rows so a
+        # table larger than memory can be scanned; stops (after logging) on a query error
+        kwargs = {"chunk_size": chunk_size} if chunk_size else {}
+        try:
+            for arrays in self.backend.iter_arrays(sql, schema, params, **kwargs):
+                yield pd.DataFrame(arrays, copy=False)
+        except self.backend.errors as e:
+            logger.error(f"Error streaming query: {e}")
+
+    def fetchone(self, sql, params=None):
+        rows = self.backend.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    def interrupt(self):
+        # Safe to call from another thread: aborts the statement currently running on this connection
+        self.backend.interrupt()
+
     def __del__(self):
         try:
-            if self.cursor:
-                self.cursor.close()
             if self.conn:
-                self.conn.close()
-                print("🔌 MySQL connection closed.")
+                self.backend.close()
+                logger.info(f"🔌 {self.backend.name} connection closed.")
         except:
             pass
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from Connectors.Backend import PIZZA_DATA_SCHEMA, PIZZA_SALES_SCHEMA, PIZZA_SCHEMA
+
+# Conversion between the flat pizza_data layout and the pizza / pizza_sales tables
+DIMENSION_COLUMNS = [name for name, _ in PIZZA_SCHEMA if name != "pizza_key"]
+MONEY_COLUMNS = {"unit_price": "unit_price_cents", "total_price": "total_price_cents",
+                 "total_cost": "total_cost_cents"}
+
+
+def resolve_pizza_keys(df, dimension=None):
+    # Returns (full dimension, rows to insert into `pizza`, pizza_key per row of df).
+    # Existing keys are reused; unseen menu items get keys after the current maximum.
+    if dimension is None:
+        dimension = pd.DataFrame({name: pd.Series(dtype=object) for name, _ in PIZZA_SCHEMA})
+    items = df[DIMENSION_COLUMNS].drop_duplicates()
+    merged = items.merge(dimension, on=DIMENSION_COLUMNS, how="left")
+    new_items = merged[merged["pizza_key"].isna()].drop(columns="pizza_key")
+    first_key = int(dimension["pizza_key"].max()) + 1 if len(dimension) else 1
+    new_items.insert(0, "pizza_key", np.arange(first_key, first_key + len(new_items)))
+    if first_key + len(new_items) > np.iinfo(np.int16).max:
+        raise ValueError("More menu items than a SMALLINT pizza_key can hold.")
+
+    full = pd.concat([dimension, new_items], ignore_index=True) if len(dimension) else new_items
+    keys = df[DIMENSION_COLUMNS].merge(full, on=DIMENSION_COLUMNS, how="left")["pizza_key"].to_numpy()
+    return full, new_items[[name for name, _ in PIZZA_SCHEMA]], keys.astype(np.int16)
+
+
+def to_sales_frame(df, keys):
+    sales = pd.DataFrame({
+        "order_id": df["order_id"].to_numpy(),
+        "pizza_key": keys,
+        "quantity": df["quantity"].to_numpy(),
+        "order_date": df["order_date"].to_numpy(),
+        "order_time": df["order_time"].to_numpy(),
+        "unit_price_cents": np.rint(df["unit_price"].to_numpy(dtype=float) * 100).astype(np.int64),
+        "discount_bp": np.rint(df["discount"].to_numpy(dtype=float) * 10000).astype(np.int64),
+        "total_price_cents": np.rint(df["total_price"].to_numpy(dtype=float) * 100).astype(np.int64),
+        "total_cost_cents": np.rint(df["total_cost"].to_numpy(dtype=float) * 100).astype(np.int64),
+        "is_holiday": df["is_holiday"].to_numpy(),
+        "time_period": df["time_period"].to_numpy(),
+    })
+    return sales[[name for name, _ in PIZZA_SALES_SCHEMA]]
+
+
+def decode_sales(sales, dimension):
+    # Back to the pizza_data columns. Text columns become Categoricals over the
+    # dimension's values, so each order line only carries small integer codes.
+    lookup = np.full(int(dimension["pizza_key"].max()) + 1, -1, dtype=np.int64)
+    lookup[dimension["pizza_key"].to_numpy()] = np.arange(len(dimension))
+    rows = lookup[sales["pizza_key"].to_numpy()]
+    if (rows < 0).any():
+        raise KeyError("pizza_sales references pizza_key values missing from pizza.")
+
+    columns = {}
+    for name, _ in PIZZA_DATA_SCHEMA:
+        if name in DIMENSION_COLUMNS:
+            values = dimension[name]
+            if values.dtype.kind in "iuf":
+                columns[name] = values.to_numpy()[rows]
+            else:
+                codes, uniques = pd.factorize(values, sort=True)
+                columns[name] = pd.Categorical.from_codes(codes[rows], categories=uniques)
+        elif name in MONEY_COLUMNS:
+            columns[name] = sales[MONEY_COLUMNS[name]].to_numpy() / 100
+        elif name == "discount":
+            columns[name] = sales["discount_bp"].to_numpy() / 10000
+        else:
+            columns[name] = sales[name].to_numpy()
+    return pd.DataFrame(columns)
+
+
+def check_round_trip(df, sales, dimension):
+    # Raises if decoding the normalized rows would not give back df's menu columns and amounts
+    decoded = decode_sales(sales, dimension)
+    for name in DIMENSION_COLUMNS:
+        if not (decoded[name].astype(str).to_numpy() == df[name].astype(str).to_numpy()).all():
+            raise ValueError(f"Column {name} does not survive the pizza / pizza_sales round trip.")
+    for name in list(MONEY_COLUMNS) + ["discount"]:
+        if not np.allclose(decoded[name].to_numpy(), df[name].to_numpy(dtype=float), atol=0.005, rtol=0):
+            raise ValueError(f"Column {name} does not survive the pizza / pizza_sales round trip.")
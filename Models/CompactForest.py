@@ -0,0 +1,174 @@
+import numpy as np
+
+
+class CompactForest:
+    # Packed, read-only copy of a fitted RandomForestRegressor.
+    # Split nodes of every tree live in one set of concatenated arrays and leaf
+    # values in another; a child index < 0 points to leaf ~index.
+    # Mean target per split node, only packed when contributions are needed (see decompose)
+    split_value = None
+
+    def __init__(self, feature, threshold, left, right, value, roots, node_offsets, leaf_offsets, n_features,
+                 split_value=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.node_offsets = node_offsets
+        self.leaf_offsets = leaf_offsets
+        self.n_features = n_features
+        self.split_value = split_value
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_forest(cls, forest, split_values=False):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        split_node_values = []
+        node_offsets, leaf_offsets = [0], [0]
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_split = tree.children_left != -1
+            n_split = int(is_split.sum())
+            n_leaf = tree.node_count - n_split
+
+            # Old node id -> packed id (split nodes >= 0, leaves encoded as ~leaf_id)
+            mapping = np.empty(tree.node_count, dtype=np.int64)
+            mapping[is_split] = np.arange(n_split) + node_offsets[-1]
+            mapping[~is_split] = ~(np.arange(n_leaf) + leaf_offsets[-1])
+
+            features.append(tree.feature[is_split])
+            thresholds.append(tree.threshold[is_split])
+            lefts.append(mapping[tree.children_left[is_split]])
+            rights.append(mapping[tree.children_right[is_split]])
+            values.append(tree.value[~is_split, 0, 0])
+            if split_values:
+                split_node_values.append(tree.value[is_split, 0, 0])
+            roots.append(mapping[0])
+
+            node_offsets.append(node_offsets[-1] + n_split)
+            leaf_offsets.append(leaf_offsets[-1] + n_leaf)
+
+        n_features = forest.n_features_in_
+        feature_dtype = np.int16 if n_features <= np.iinfo(np.int16).max else np.int32
+        return cls(
+            feature=np.concatenate(features).astype(feature_dtype),
+            threshold=cls._floor_to_float32(np.concatenate(thresholds)),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            node_offsets=np.asarray(node_offsets, dtype=np.int64),
+            leaf_offsets=np.asarray(leaf_offsets, dtype=np.int64),
+            n_features=n_features,
+            split_value=np.concatenate(split_node_values).astype(np.float64) if split_values else None,
+        )
+
+    @staticmethod
+    def _floor_to_float32(threshold):
+        # sklearn compares float32 inputs against float64 thresholds. Rounding the
+        # threshold down to the nearest float32 keeps every "x <= t" decision identical.
+        threshold32 = threshold.astype(np.float32)
+        too_high = threshold32.astype(np.float64) > threshold
+        threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+        return threshold32
+
+    def apply(self, X):
+        # Walk all trees for the whole batch at once: one (n_trees, n_rows) cursor
+        # array advanced level by level until every cursor sits on a leaf.
+        n_rows = X.shape[0]
+        node = np.repeat(self.roots, n_rows)
+        rows = np.tile(np.arange(n_rows), self.n_trees)
+        active = np.flatnonzero(node >= 0)
+        while active.size:
+            idx = node[active]
+            go_left = X[rows[active], self.feature[idx]] <= self.threshold[idx]
+            node[active] = np.where(go_left, self.left[idx], self.right[idx])
+            active = active[node[active] >= 0]
+        return (~node).reshape(self.n_trees, n_rows)
+
+    def predict(self, X):
+        return self.mean_of_trees(self.predict_trees(X))
+
+    def predict_trees(self, X):
+        # (n_trees, n_rows) output of every tree, for spread/quantiles across the forest
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input with {self.n_features} features, got shape {X.shape}.")
+        return self.value[self.apply(X)]
+
+    def mean_of_trees(self, tree_values):
+        # Sum in estimator order (cumsum is strictly sequential) so the result is
+        # bit-identical to RandomForestRegressor.predict.
+        return np.cumsum(tree_values, axis=0)[-1] / self.n_trees
+
+    def split_bins(self, feature_index, values):
+        # Interval of each value between the forest's thresholds on one feature: values in
+        # the same bin take the same branch at every split on that feature
+        thresholds = np.unique(self.threshold[self.feature == feature_index])
+        return np.searchsorted(thresholds, np.asarray(values, dtype=np.float32), side='left')
+
+    def decompose(self, X):
+        # Splits every prediction into bias + per-feature contributions by walking the
+        # decision paths of all trees for the whole batch together: each step from a node
+        # to its child credits the change in node mean to the node's split feature.
+        # Returns (bias, contributions) with bias + contributions.sum(axis=1) == predict(X).
+        if self.split_value is None:
+            raise ValueError("Forest was packed without split values; use from_forest(..., split_values=True).")
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input with {self.n_features} features, got shape {X.shape}.")
+
+        n_rows = X.shape[0]
+        root_values = np.where(self.roots >= 0, self.split_value[np.maximum(self.roots, 0)],
+                               self.value[np.maximum(~self.roots, 0)])
+        contributions = np.zeros(n_rows * self.n_features, dtype=np.float64)
+        node = np.repeat(self.roots, n_rows)
+        rows = np.tile(np.arange(n_rows), self.n_trees)
+        active = np.flatnonzero(node >= 0)
+        while active.size:
+            idx = node[active]
+            go_left = X[rows[active], self.feature[idx]] <= self.threshold[idx]
+            child = np.where(go_left, self.left[idx], self.right[idx])
+            child_value = np.where(child >= 0, self.split_value[np.maximum(child, 0)],
+                                   self.value[np.maximum(~child, 0)])
+            contributions += np.bincount(rows[active] * self.n_features + self.feature[idx],
+                                         weights=child_value - self.split_value[idx],
+                                         minlength=contributions.size)
+            node[active] = child
+            active = active[child >= 0]
+        bias = float(root_values.mean())
+        return bias, contributions.reshape(n_rows, self.n_features) / self.n_trees
+
+    def node_table(self):
+        nodes = np.empty(len(self.feature), dtype=[("feature", self.feature.dtype),
+                                                   ("threshold", self.threshold.dtype),
+                                                   ("left", self.left.dtype),
+                                                   ("right", self.right.dtype)])
+        nodes["feature"] = self.feature
+        nodes["threshold"] = self.threshold
+        nodes["left"] = self.left
+        nodes["right"] = self.right
+        return {"nodes": nodes, "value": self.value, "roots": self.roots}
+
+    def bytes_per_tree(self):
+        n_split = np.diff(self.node_offsets)
+        n_leaf = np.diff(self.leaf_offsets)
+        split_bytes = (self.feature.itemsize + self.threshold.itemsize
+                       + self.left.itemsize + self.right.itemsize)
+        if self.split_value is not None:
+            split_bytes += self.split_value.itemsize
+        return n_split * split_bytes + n_leaf * self.value.itemsize + self.roots.itemsize
+
+    @property
+    def nbytes(self):
+        arrays = [self.feature, self.threshold, self.left, self.right, self.value, self.roots,
+                  self.node_offsets, self.leaf_offsets]
+        if self.split_value is not None:
+            arrays.append(self.split_value)
+        return int(sum(a.nbytes for a in arrays))
@@ -0,0 +1,116 @@
+import numpy as np
+
+from .Telemetry import get_logger
+
+logger = get_logger("drift")
+
+DRIFT_BINS = 20
+# Rules of thumb: PSI >= 0.2 is a significant shift; KS is the largest gap between the binned CDFs
+PSI_THRESHOLD = 0.2
+KS_THRESHOLD = 0.1
+MIN_DRIFT_ROWS = 500
+# Calendar parts move forward with every new batch by construction; they are sketched
+# and scored but do not trigger retraining on their own
+CALENDAR_FEATURES = ("day", "month", "year", "day_of_week")
+
+
+def _columns(X, y=None):
+    for j in range(X.shape[1]):
+        yield X[:, j]
+    if y is not None:
+        yield y
+
+
+class FeatureSketch:
+    # One fixed-edge histogram per column. Edges come from the training quantiles and
+    # never change, so sketches of separate batches merge by adding their counts.
+    def __init__(self, columns, edges, counts=None):
+        self.columns = list(columns)
+        self.edges = edges
+        self.counts = counts if counts is not None else [np.zeros(len(e) + 1, dtype=np.int64) for e in edges]
+
+    @classmethod
+    def from_matrix(cls, X, columns, n_bins=DRIFT_BINS, y=None):
+        # y, if given, is sketched as one more column after X's; the two are never stacked,
+        # so only one column at a time is converted
+        cut_points = np.linspace(0, 1, n_bins + 1)[1:-1]
+        edges = [np.unique(np.quantile(values, cut_points)).astype(np.float64) for values in _columns(X, y)]
+        sketch = cls(columns, edges)
+        sketch.update(X, y)
+        return sketch
+
+    def empty_like(self):
+        return FeatureSketch(self.columns, self.edges)
+
+    def update(self, X, y=None):
+        # Bin j holds values in (edges[j - 1], edges[j]]; outside the training range lands in the end bins
+        for j, (edges, values) in enumerate(zip(self.edges, _columns(X, y))):
+            bins = np.searchsorted(edges, values, side="left")
+            self.counts[j] += np.bincount(bins, minlength=len(edges) + 1)
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge sketches of different columns.")
+        for counts, other_counts in zip(self.counts, other.counts):
+            counts += other_counts
+        return self
+
+    @property
+    def rows(self):
+        return int(self.counts[0].sum()) if self.counts else 0
+
+    @property
+    def nbytes(self):
+        return int(sum(e.nbytes + c.nbytes for e, c in zip(self.edges, self.counts)))
+
+
+def population_stability_index(expected, actual, eps=1e-4):
+    p = np.clip(expected / max(expected.sum(), 1), eps, None)
+    q = np.clip(actual / max(actual.sum(), 1), eps, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def binned_ks(expected, actual):
+    p = np.cumsum(expected) / max(expected.sum(), 1)
+    q = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(p - q)))
+
+
+class DriftMonitor:
+    # Accumulates sketches of new data against the training sketch of one model version
+    def __init__(self, reference, model_version=None, psi_threshold=PSI_THRESHOLD, ks_threshold=KS_THRESHOLD,
+                 min_rows=MIN_DRIFT_ROWS, ignored=CALENDAR_FEATURES):
+        self.reference = reference
+        self.current = reference.empty_like()
+        self.model_version = model_version
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.min_rows = min_rows
+        self.ignored = tuple(ignored)
+
+    def update(self, X, y=None):
+        self.current.update(X, y)
+        return self
+
+    def reset(self):
+        self.current = self.reference.empty_like()
+
+    def scores(self):
+        return {
+            col: {"psi": population_stability_index(ref, cur), "ks": binned_ks(ref, cur)}
+            for col, ref, cur in zip(self.reference.columns, self.reference.counts, self.current.counts)
+        }
+
+    def report(self):
+        scores = self.scores() if self.current.rows else {}
+        drifted = [col for col, score in scores.items() if col not in self.ignored and
+                   (score["psi"] >= self.psi_threshold or score["ks"] >= self.ks_threshold)]
+        retrain = self.current.rows >= self.min_rows and bool(drifted)
+        if retrain:
+            logger.info(f"Drift in {drifted} over {self.current.rows} new rows; retraining recommended.")
+        return {"model_version": self.model_version, "rows": self.current.rows, "scores": scores,
+                "drifted": drifted, "retrain": retrain}
+
+    def should_retrain(self):
+        return self.report()["retrain"]
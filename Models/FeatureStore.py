@@ -0,0 +1,128 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+DROPPED_COLUMNS = ['order_id', 'pizza_id', 'pizza_ingredients', 'order_time']
+CATEGORICAL_COLUMNS = ['pizza_name', 'pizza_size', 'pizza_category', 'time_period']
+DATE_PART_COLUMNS = ['day', 'month', 'year', 'day_of_week']
+
+
+def extend_label_encoder(le, values):
+    # Copy of le with unseen labels appended after the known classes, so codes the
+    # fitted trees already split on stay valid. Object classes_ make sklearn map
+    # labels with a lookup table instead of searchsorted, which needs sorted classes.
+    known = set(le.classes_)
+    unseen = [label for label in pd.unique(np.asarray(values, dtype=object)) if label not in known]
+    extended = LabelEncoder()
+    extended.classes_ = np.concatenate([le.classes_.astype(object), np.array(sorted(unseen), dtype=object)])
+    return extended
+
+
+class FeatureStore:
+    # Encoded training data held as one C-contiguous float32 matrix, sorted by
+    # order_date so every time-series fold is a contiguous (zero-copy) row range.
+    def __init__(self, X, y, order_dates, feature_columns, positions, fingerprint):
+        self.X = X
+        self.y = y
+        self.order_dates = order_dates
+        self.feature_columns = feature_columns
+        # positions[i] = row of the store holding row i of the source DataFrame
+        self.positions = positions
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.y)
+
+    @property
+    def nbytes(self):
+        return self.X.nbytes + self.y.nbytes + self.order_dates.nbytes + self.positions.nbytes
+
+    @staticmethod
+    def fingerprint_of(df):
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        digest = hashlib.sha1(row_hashes.tobytes())
+        digest.update("|".join(map(str, df.columns)).encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, df, fingerprint=None, label_encoders=None):
+        # Returns the store and the LabelEncoders fitted on df's categorical columns.
+        # Given existing encoders, their codes are kept and unseen labels get new codes.
+        order_date = pd.to_datetime(df['order_date'])
+        order = np.argsort(order_date.to_numpy(), kind='stable')
+        if np.all(order[1:] > order[:-1]):
+            order = None
+
+        base_columns = [col for col in df.columns
+                        if col not in DROPPED_COLUMNS and col not in ('quantity', 'order_date')]
+        feature_columns = base_columns + DATE_PART_COLUMNS
+        date_parts = {
+            'day': order_date.dt.day,
+            'month': order_date.dt.month,
+            'year': order_date.dt.year,
+            'day_of_week': order_date.dt.dayofweek,
+        }
+
+        fitted = label_encoders
+        label_encoders = {}
+        X = np.empty((len(df), len(feature_columns)), dtype=np.float32)
+        for j, col in enumerate(feature_columns):
+            if col in CATEGORICAL_COLUMNS:
+                if fitted is None:
+                    le = LabelEncoder()
+                    values = le.fit_transform(df[col].astype(str))
+                else:
+                    le = extend_label_encoder(fitted[col], df[col].astype(str))
+                    values = le.transform(df[col].astype(str))
+                label_encoders[col] = le
+            elif col in date_parts:
+                values = date_parts[col].to_numpy()
+            else:
+                values = df[col].astype(float).to_numpy()
+            X[:, j] = values if order is None else values[order]
+
+        y = df['quantity'].to_numpy()
+        dates = order_date.to_numpy()
+        if order is None:
+            positions = np.arange(len(df))
+        else:
+            y, dates = y[order], dates[order]
+            positions = np.empty(len(df), dtype=np.int64)
+            positions[order] = np.arange(len(df))
+
+        store = cls(X, y, dates, feature_columns, positions,
+                    fingerprint or cls.fingerprint_of(df))
+        return store, label_encoders
+
+    def date_folds(self, n_splits):
+        # Rolling-origin folds: the distinct dates are cut into n_splits + 1 consecutive
+        # blocks, fold k trains on every block before block k and tests on block k.
+        unique_dates = np.unique(self.order_dates)
+        if len(unique_dates) < n_splits + 1:
+            raise ValueError(f"Need at least {n_splits + 1} distinct order dates for {n_splits} folds, "
+                             f"got {len(unique_dates)}.")
+        folds = []
+        for block in np.array_split(unique_dates, n_splits + 1)[1:]:
+            start = int(np.searchsorted(self.order_dates, block[0], side='left'))
+            stop = int(np.searchsorted(self.order_dates, block[-1], side='right'))
+            folds.append((slice(0, start), slice(start, stop), block[0], block[-1]))
+        return folds
+
+    def date_split(self, train_size):
+        # Holdout on the date-sorted rows: roughly the first train_size of them, extended to the
+        # end of that day, train; the rest test. Both parts are slices, i.e. views of X and y.
+        cut = min(max(int(round(len(self) * train_size)), 1), len(self) - 1)
+        stop = int(np.searchsorted(self.order_dates, self.order_dates[cut - 1], side='right'))
+        if stop >= len(self):
+            stop = cut
+        return slice(0, stop), slice(stop, len(self))
+
+    def take(self, rows):
+        return self.X[rows], self.y[rows]
+
+    def to_frame(self, rows):
+        frame = pd.DataFrame(self.X[rows], columns=self.feature_columns)
+        frame['quantity'] = self.y[rows]
+        frame['order_date'] = self.order_dates[rows]
+        return frame
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .Telemetry import get_logger, span
+
+logger = get_logger("ingredients")
+
+
+def parse_ingredients(text):
+    return [item.strip() for item in str(text).split(",") if item.strip()]
+
+
+class IngredientMatrix:
+    # Sparse (pizza x ingredient) incidence matrix: row i has a 1 for every ingredient
+    # of pizza i, so (quantities per date x pizza) @ matrix = ingredient demand per date.
+    def __init__(self, matrix, pizza_names, ingredients):
+        self.matrix = matrix
+        self.pizza_names = np.asarray(pizza_names, dtype=object)
+        self.ingredients = np.asarray(ingredients, dtype=object)
+        self._pizza_index = pd.Index(self.pizza_names)
+
+    @classmethod
+    def from_menu(cls, menu):
+        # menu: rows with pizza_name and pizza_ingredients; the first list per pizza is used
+        menu = menu.drop_duplicates("pizza_name")
+        pizza_names = menu["pizza_name"].astype(str).to_numpy()
+        parsed = [parse_ingredients(text) for text in menu["pizza_ingredients"]]
+        ingredients = sorted({item for items in parsed for item in items})
+        column = {item: j for j, item in enumerate(ingredients)}
+        rows = np.repeat(np.arange(len(parsed)), [len(items) for items in parsed])
+        cols = np.array([column[item] for items in parsed for item in items], dtype=np.int64)
+        matrix = sparse.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(len(parsed), len(ingredients)))
+        # An ingredient listed twice for one pizza still counts once
+        matrix.data[:] = 1.0
+        return cls(matrix, pizza_names, ingredients)
+
+    def __contains__(self, pizza_name):
+        return pizza_name in self._pizza_index
+
+    def demand(self, dates, products, quantities):
+        # Returns a (date x ingredient) DataFrame of pizzas that need each ingredient
+        with span("ingredients.demand"):
+            product_codes = self._pizza_index.get_indexer(np.asarray(products, dtype=object))
+            known = product_codes >= 0
+            if not known.all():
+                unknown = pd.unique(np.asarray(products, dtype=object)[~known])
+                logger.warning(f"No ingredient list for {list(unknown)}; their quantities are ignored.")
+            date_codes, unique_dates = pd.factorize(pd.to_datetime(np.asarray(dates)[known]), sort=True)
+            quantities = np.asarray(quantities, dtype=np.float64)[known]
+            per_date = sparse.csr_matrix((quantities, (date_codes, product_codes[known])),
+                                         shape=(len(unique_dates), len(self.pizza_names)))
+            demand = (per_date @ self.matrix).toarray()
+        return pd.DataFrame(demand, index=pd.DatetimeIndex(unique_dates, name="date"), columns=self.ingredients)
+
+    def historical_demand(self, df):
+        return self.demand(df["order_date"].to_numpy(), df["pizza_name"].astype(str).to_numpy(),
+                           df["quantity"].to_numpy())
+
+    def forecast_demand(self, forecasts):
+        # forecasts: rows with date, product and predicted_quantity (batchforecast.py output)
+        return self.demand(forecasts["date"].to_numpy(), forecasts["product"].to_numpy(),
+                           forecasts["predicted_quantity"].to_numpy())
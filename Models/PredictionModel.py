@@ -1,9 +1,99 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+import json
+import time
+import joblib
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from sklearn.model_selection import ParameterSampler
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from .CompactForest import CompactForest
+from .DriftMonitor import DriftMonitor, FeatureSketch
+from .PredictionCache import PredictionCache
+from .FeatureStore import FeatureStore
+from .Telemetry import get_logger, span
+
+logger = get_logger("model")
+
+# Tree size limits for RandomForestRegressor; smaller presets trade a little
+# accuracy for a forest that fits on low-memory store terminals.
+MODEL_SIZE_PRESETS = {
+    "full": {"max_depth": None, "max_leaf_nodes": None},
+    "balanced": {"max_depth": 20, "max_leaf_nodes": 8192},
+    "compact": {"max_depth": 14, "max_leaf_nodes": 2048},
+    "terminal": {"max_depth": 10, "max_leaf_nodes": 512},
+}
+
+EVALUATION_MODES = ("holdout", "timeseries_cv")
+
+# Rows of held-out data that permutation importance scores on; a sample keeps it fast
+PERMUTATION_MAX_ROWS = 20000
+
+# Price/discount optimizer: default grid around the catalog price, objectives it can maximise,
+# and how many (scenario x day) rows go through the forest at once
+PRICE_GRID_RANGE = (0.8, 1.2)
+DEFAULT_DISCOUNT_GRID = np.round(np.arange(0.0, 0.31, 0.01), 2)
+OPTIMIZER_OBJECTIVES = ("revenue", "margin")
+OPTIMIZER_CHUNK_ROWS = 100_000
+
+DEFAULT_SEARCH_SPACE = {
+    "n_estimators": [50, 100, 200, 300],
+    "max_depth": [None, 10, 14, 20, 30],
+    "max_leaf_nodes": [None, 512, 2048, 8192],
+    "min_samples_leaf": [1, 2, 5, 10],
+    "max_features": [1.0, 0.7, 0.5, "sqrt"],
+}
+
+
+def score_predictions(y_true, y_pred):
+    # Quantities are whole, non-negative numbers
+    y_pred = np.maximum(0, np.round(y_pred).astype(int))
+    mse = mean_squared_error(y_true, y_pred)
+    return {
+        "MAE": mean_absolute_error(y_true, y_pred),
+        "MSE": mse,
+        "RMSE": np.sqrt(mse),
+        "R2": r2_score(y_true, y_pred),
+    }
+
+
+def _fit_and_score_fold(X_train, y_train, X_test, y_test, rf_params):
+    model = RandomForestRegressor(n_jobs=1, **rf_params)
+    model.fit(X_train, y_train)
+    return score_predictions(y_test, model.predict(X_test))
+
+
+# Feature matrix shared by every fold/candidate a worker process evaluates; it is
+# shipped once per worker instead of once per task, and tasks only carry row slices.
+_worker_data = None
+
+
+def _init_worker_data(X, y):
+    global _worker_data
+    _worker_data = (X, y)
+
+
+def _score_candidate(candidate_id, rf_params, train_rows, test_rows):
+    X, y = _worker_data
+    start = time.perf_counter()
+    scores = _fit_and_score_fold(X[train_rows], y[train_rows], X[test_rows], y[test_rows], rf_params)
+    return candidate_id, scores, time.perf_counter() - start
+
+
+_worker_forest = None
+
+
+def _init_importance_worker(forest, X, y):
+    global _worker_forest
+    _worker_forest = forest
+    _init_worker_data(X, y)
+
+
+def _permuted_mae(feature_index, seed):
+    X, y = _worker_data
+    X_permuted = X.copy()
+    X_permuted[:, feature_index] = np.random.default_rng(seed).permutation(X[:, feature_index])
+    return feature_index, score_predictions(y, _worker_forest.predict(X_permuted))["MAE"]
 
 
 class PredictionModel:
@@ -12,222 +102,794 @@ class PredictionModel:
         self.label_encoders = {}
         self.metrics = {}
         self.feature_importances = None
-        self.train_df = None
-        self.test_df = None
+        self.permutation_importances = None
+        self.training_sketch = None
+        self.feature_store = None
+        self._train_rows = None
+        self._test_rows = None
         self.original_df = None
+        self.compact_forest = None
+        # (model_version, CompactForest with split values) for contributions and the price optimizer
+        self._split_value_forest = None
+        self.feature_columns = None
+        self.model_version = 0
+        self.prediction_cache = PredictionCache()
+        self.leaderboard = []
+        self.product_catalog = []
+
+    @property
+    def train_df(self):
+        if self.feature_store is None or self._train_rows is None:
+            return None
+        return self.feature_store.to_frame(self._train_rows)
+
+    @property
+    def test_df(self):
+        if self.feature_store is None or self._test_rows is None:
+            return None
+        return self.feature_store.to_frame(self._test_rows)
 
     def set_original_data(self, original_df):
         self.original_df = original_df.copy() if original_df is not None else None
 
-    def preprocess_data(self, df, fit=False):
-        print("Starting preprocess_data...")
-        try:
-            df = df.copy()
-            df = df.drop(['order_id', 'pizza_id', 'pizza_ingredients', 'order_time'], axis=1, errors='ignore')
-
-            df['order_date'] = pd.to_datetime(df['order_date'])
-            df['day'] = df['order_date'].dt.day
-            df['month'] = df['order_date'].dt.month
-            df['year'] = df['order_date'].dt.year
-            df['day_of_week'] = df['order_date'].dt.dayofweek
-
-            categorical_columns = ['pizza_name', 'pizza_size', 'pizza_category', 'time_period']
-            if fit:
-                for col in categorical_columns:
-                    le = LabelEncoder()
-                    df[col] = le.fit_transform(df[col].astype(str))
-                    self.label_encoders[col] = le
-                    print(f"LabelEncoder for {col} fitted with classes: {le.classes_}")
-            else:
-                for col in categorical_columns:
-                    if col not in self.label_encoders:
-                        raise ValueError(f"LabelEncoder for {col} not found. Please train the model first.")
-                    le = self.label_encoders[col]
-                    df[col] = df[col].astype(str).apply(lambda x: x if x in le.classes_ else le.classes_[0])
-                    df[col] = le.transform(df[col])
-
-            df['is_holiday'] = df['is_holiday'].astype(int)
-            return df
-        except Exception as e:
-            print(f"Error preprocessing data: {e}")
-            return None
-
-    def train_model(self, df, train_size=0.8):
-        print("Starting train_model...")
+    def train_model(self, df, train_size=0.8, size_preset="full", compact=False,
+                    evaluation="holdout", n_splits=5, n_jobs=None, params=None):
+        logger.debug("Starting train_model...")
         try:
+            if size_preset not in MODEL_SIZE_PRESETS:
+                raise ValueError(f"Unknown size preset '{size_preset}'. "
+                                 f"Available presets: {list(MODEL_SIZE_PRESETS)}")
+            if evaluation not in EVALUATION_MODES:
+                raise ValueError(f"Unknown evaluation mode '{evaluation}'. "
+                                 f"Available modes: {list(EVALUATION_MODES)}")
             if df.empty:
-                print("No data available for training.")
+                logger.info("No data available for training.")
                 return False
 
-            df = self.preprocess_data(df, fit=True)
-            if df is None:
-                print("Failed to preprocess data.")
-                return False
+            store = self.get_feature_store(df)
 
-            X = df.drop(['quantity', 'order_date'], axis=1)
-            y = df['quantity']
+            rf_params = dict(n_estimators=100, random_state=42, **MODEL_SIZE_PRESETS[size_preset])
+            if params:
+                rf_params.update(params)
 
-            self.train_df, self.test_df = train_test_split(df, train_size=train_size, random_state=42)
-            X_train = self.train_df.drop(['quantity', 'order_date'], axis=1)
-            y_train = self.train_df['quantity']
-            X_test = self.test_df.drop(['quantity', 'order_date'], axis=1)
-            y_test = self.test_df['quantity']
+            if evaluation == "timeseries_cv":
+                cv_metrics = self.cross_validate(store, rf_params, n_splits=n_splits, n_jobs=n_jobs)
+                # Folds already measured generalisation; the served model uses all history
+                self._train_rows, self._test_rows = slice(0, len(store)), None
+                X_train, y_train = store.X, store.y
+            else:
+                # The newest dates are held out; slices of the date-sorted store need no copy
+                self._train_rows, self._test_rows = store.date_split(train_size)
+                X_train, y_train = store.take(self._train_rows)
+                logger.info(f"Train set size: {len(y_train)}, "
+                            f"Test set size: {self._test_rows.stop - self._test_rows.start}")
+
+            self.compact_forest = None
+            self.rf_model = RandomForestRegressor(**rf_params)
+            with span("model.fit"):
+                self.rf_model.fit(X_train, y_train)
+            logger.info(f"Model trained successfully (size preset: {size_preset}).")
+
+            features = store.feature_columns
+            self.feature_columns = list(features)
+            self.feature_importances = dict(zip(features, self.rf_model.feature_importances_))
+            for feature, importance in self.feature_importances.items():
+                logger.debug("Feature importance %s: %.4f", feature, importance)
 
-            print(f"Train set size: {len(self.train_df)}, Test set size: {len(self.test_df)}")
+            train_mae = score_predictions(y_train, self.rf_model.predict(X_train))["MAE"]
+            logger.info(f"Training MAE: {train_mae:.4f}")
+            # What the training data looked like, for drift checks on data that arrives later
+            self.training_sketch = FeatureSketch.from_matrix(X_train, self.feature_columns + ['quantity'],
+                                                             y=y_train)
+            del X_train, y_train
 
-            self.rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.rf_model.fit(X_train, y_train)
-            print("Model trained successfully.")
+            if evaluation == "timeseries_cv":
+                self.metrics = cv_metrics
+            else:
+                X_test, y_test = store.take(self._test_rows)
+                self.metrics = score_predictions(y_test, self.rf_model.predict(X_test))
+                self.metrics["evaluation"] = "holdout"
 
-            features = X_train.columns
-            self.feature_importances = dict(zip(features, self.rf_model.feature_importances_))
-            print("Feature Importances:")
-            for feature, importance in self.feature_importances.items():
-                print(f"{feature}: {importance:.4f}")
+            logger.info(f"Evaluation ({self.metrics['evaluation']}): MAE: {self.metrics['MAE']:.4f}, "
+                        f"MSE: {self.metrics['MSE']:.4f}, RMSE: {self.metrics['RMSE']:.4f}, "
+                        f"R2 Score: {self.metrics['R2']:.4f}")
 
-            y_train_pred = self.rf_model.predict(X_train)
-            y_train_pred = np.round(y_train_pred).astype(int)
-            y_train_pred = np.maximum(0, y_train_pred)
-            train_mae = mean_absolute_error(y_train, y_train_pred)
-            print(f"Training MAE: {train_mae:.4f}")
+            # The flattened forest serves all predictions; the sklearn estimator is
+            # only kept around unless compaction was requested.
+            self.compact_model(keep_estimator=not compact)
+            self.product_catalog = self._build_product_catalog(df)
 
-            y_pred = self.rf_model.predict(X_test)
-            y_pred = np.round(y_pred).astype(int)
-            y_pred = np.maximum(0, y_pred)
+            # New model artifact: cached predictions of the previous one are stale
+            self.model_version += 1
+            self.prediction_cache.clear()
 
-            self.metrics["MAE"] = mean_absolute_error(y_test, y_pred)
-            self.metrics["MSE"] = mean_squared_error(y_test, y_pred)
-            self.metrics["RMSE"] = np.sqrt(self.metrics["MSE"])
-            self.metrics["R2"] = r2_score(y_test, y_pred)
+            return True
+        except Exception as e:
+            logger.error(f"Error in train_model: {e}")
+            return False
 
-            print("Evaluation Metrics:")
-            print(f"MAE: {self.metrics['MAE']:.4f}")
-            print(f"MSE: {self.metrics['MSE']:.4f}")
-            print(f"RMSE: {self.metrics['RMSE']:.4f}")
-            print(f"R2 Score: {self.metrics['R2']:.4f}")
+    def update_model(self, df, n_new_trees=20, max_trees=None):
+        # Warm-start update: fits n_new_trees on df (typically the newest orders) next to the
+        # existing trees and retires the oldest ones beyond max_trees. Label codes are kept.
+        logger.debug("Starting update_model...")
+        if self.rf_model is None:
+            logger.error("Incremental updates need the sklearn estimator; train with compact=False first.")
+            return False
+        try:
+            if df.empty:
+                logger.info("No new data to update the model with.")
+                return False
 
+            with span("model.preprocess"):
+                store, label_encoders = FeatureStore.build(df, label_encoders=self.label_encoders)
+            if list(store.feature_columns) != self.feature_columns:
+                raise ValueError(f"New data has features {store.feature_columns}, "
+                                 f"the model was trained on {self.feature_columns}.")
+            for col, le in label_encoders.items():
+                added = len(le.classes_) - len(self.label_encoders[col].classes_)
+                if added:
+                    logger.info(f"{added} new {col} value(s) encoded: {list(le.classes_[-added:])}")
+
+            # Forecast error on the new rows before they are learned: a true out-of-sample check
+            before = score_predictions(store.y, self._predict_matrix(store.X))
+
+            self.rf_model.set_params(warm_start=True, n_estimators=len(self.rf_model.estimators_) + n_new_trees)
+            with span("model.update"):
+                self.rf_model.fit(store.X, store.y)
+            self.rf_model.set_params(warm_start=False)
+            if max_trees and len(self.rf_model.estimators_) > max_trees:
+                self.rf_model.estimators_ = self.rf_model.estimators_[-max_trees:]
+                self.rf_model.n_estimators = max_trees
+
+            self.label_encoders = label_encoders
+            self.feature_importances = dict(zip(self.feature_columns, self.rf_model.feature_importances_))
+            self.metrics["last_update"] = {
+                "rows": len(store),
+                "trees": len(self.rf_model.estimators_),
+                "MAE_before_update": float(before["MAE"]),
+                "RMSE_before_update": float(before["RMSE"]),
+            }
+            logger.info(f"Model updated with {len(store)} rows: +{n_new_trees} trees, "
+                        f"{len(self.rf_model.estimators_)} in total. MAE on the new rows before the update: "
+                        f"{before['MAE']:.4f}")
+
+            if self.training_sketch is not None:
+                self.training_sketch.update(store.X, store.y)
+            self.compact_model(keep_estimator=True)
+            known = {(entry['pizza_name'], entry['pizza_size']) for entry in self.product_catalog}
+            self.product_catalog = self.product_catalog + [
+                entry for entry in self._build_product_catalog(df)
+                if (entry['pizza_name'], entry['pizza_size']) not in known
+            ]
+
+            # Encoded matrix of the previous data used the old encoders; predictions are stale
+            self.feature_store = None
+            self._train_rows = self._test_rows = None
+            self.model_version += 1
+            self.prediction_cache.clear()
             return True
         except Exception as e:
-            print(f"Error in train_model: {e}")
+            logger.error(f"Error in update_model: {e}")
             return False
 
+    def drift_features(self, df):
+        # New rows encoded like the training matrix, and their quantities; for DriftMonitor.update
+        store, _ = FeatureStore.build(df, label_encoders=self.label_encoders)
+        if list(store.feature_columns) != self.feature_columns:
+            raise ValueError(f"New data has features {store.feature_columns}, "
+                             f"the model was trained on {self.feature_columns}.")
+        return store.X, store.y
+
+    def create_drift_monitor(self, **thresholds):
+        if self.training_sketch is None:
+            logger.error("Model has no training sketch; train (or retrain) it to enable drift monitoring.")
+            return None
+        return DriftMonitor(self.training_sketch, model_version=self.model_version, **thresholds)
+
+    def get_feature_store(self, df):
+        # Encoded matrix is rebuilt only when the source data changes
+        store, label_encoders = self._build_feature_store(df)
+        if store is not self.feature_store:
+            self.feature_store = store
+            self.label_encoders = label_encoders
+            self._train_rows = self._test_rows = None
+        return store
+
+    def _build_feature_store(self, df):
+        # Returns (store, label encoders) for df without touching the served model's state
+        fingerprint = FeatureStore.fingerprint_of(df)
+        if self.feature_store is not None and self.feature_store.fingerprint == fingerprint:
+            logger.debug("Reusing cached feature matrix.")
+            return self.feature_store, self.label_encoders
+
+        with span("model.preprocess"):
+            store, label_encoders = FeatureStore.build(df, fingerprint=fingerprint)
+        for col, le in label_encoders.items():
+            logger.debug("LabelEncoder for %s fitted with classes: %s", col, le.classes_)
+        logger.info(f"Feature matrix built: {store.X.shape[0]} rows x {store.X.shape[1]} features, "
+                    f"{store.nbytes / 1e6:.1f} MB.")
+        return store, label_encoders
+
+    def cross_validate(self, store, rf_params, n_splits=5, n_jobs=None):
+        # Folds are contiguous row ranges of the store, fitted in parallel worker processes
+        folds = store.date_folds(n_splits)
+        with span("model.cross_validate"), ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker_data,
+                                 initargs=(store.X, store.y)) as executor:
+            futures = [
+                executor.submit(_score_candidate, i, rf_params, train_rows, test_rows)
+                for i, (train_rows, test_rows, _, _) in enumerate(folds)
+            ]
+            fold_scores = [future.result()[1] for future in futures]
+
+        fold_metrics = []
+        for i, ((train_rows, test_rows, test_start, test_end), scores) in enumerate(zip(folds, fold_scores)):
+            fold = {"fold": i + 1, "train_size": train_rows.stop - train_rows.start,
+                    "test_size": test_rows.stop - test_rows.start,
+                    "test_start": pd.Timestamp(test_start), "test_end": pd.Timestamp(test_end)}
+            fold.update(scores)
+            fold_metrics.append(fold)
+            logger.info(f"Fold {i + 1}: test {fold['test_start'].date()} - {fold['test_end'].date()}, "
+                        f"MAE: {scores['MAE']:.4f}, RMSE: {scores['RMSE']:.4f}, R2: {scores['R2']:.4f}")
+
+        metrics = {"evaluation": "timeseries_cv", "folds": fold_metrics}
+        for name in ("MAE", "MSE", "RMSE", "R2"):
+            values = [scores[name] for scores in fold_scores]
+            metrics[name] = float(np.mean(values))
+            metrics[f"{name}_std"] = float(np.std(values))
+        return metrics
+
+    def search_hyperparameters(self, df, param_space=None, n_iter=20, time_budget=None, n_splits=3,
+                               n_jobs=None, leaderboard_path=None, random_state=42, refit=True):
+        # Randomized search over time-series CV folds. Candidates still queued when
+        # time_budget (seconds) runs out are cancelled; running fits are allowed to finish.
+        # The served model and its encoders only change if the best candidate is refitted. The
+        # leaderboard is kept on the model (and in its saved artifact); leaderboard_path also
+        # rewrites it to a JSON file after every finished candidate.
+        logger.debug("Starting search_hyperparameters...")
+        try:
+            if df.empty:
+                logger.info("No data available for hyperparameter search.")
+                return []
+
+            store, label_encoders = self._build_feature_store(df)
+            folds = store.date_folds(n_splits)
+
+            candidates = list(ParameterSampler(param_space or DEFAULT_SEARCH_SPACE, n_iter=n_iter,
+                                               random_state=random_state))
+            fold_scores = {i: [] for i in range(len(candidates))}
+            fit_seconds = {i: 0.0 for i in range(len(candidates))}
+            leaderboard = []
+
+            deadline = time.monotonic() + time_budget if time_budget else None
+            executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker_data,
+                                           initargs=(store.X, store.y))
+            try:
+                pending = {
+                    executor.submit(_score_candidate, i, dict(random_state=random_state, **params),
+                                    train_rows, test_rows)
+                    for i, params in enumerate(candidates)
+                    for train_rows, test_rows, _, _ in folds
+                }
+                while pending:
+                    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        candidate_id, scores, seconds = future.result()
+                        fold_scores[candidate_id].append(scores)
+                        fit_seconds[candidate_id] += seconds
+                        if len(fold_scores[candidate_id]) == len(folds):
+                            leaderboard.append(self._leaderboard_entry(
+                                candidates[candidate_id], fold_scores[candidate_id], fit_seconds[candidate_id]))
+                            leaderboard.sort(key=lambda entry: entry["MAE"])
+                            self._save_leaderboard(leaderboard, leaderboard_path)
+                    if deadline is not None and time.monotonic() >= deadline and pending:
+                        logger.warning(f"Time budget of {time_budget}s reached, cancelling remaining candidates.")
+                        break
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+            logger.info(f"Evaluated {len(leaderboard)} of {len(candidates)} candidates.")
+            for rank, entry in enumerate(leaderboard[:5], start=1):
+                logger.info(f"#{rank} MAE: {entry['MAE']:.4f}, RMSE: {entry['RMSE']:.4f}, params: {entry['params']}")
+
+            self.leaderboard = leaderboard
+            if refit and leaderboard:
+                # Hand the search's matrix to train_model instead of encoding df again
+                if store is not self.feature_store:
+                    self.feature_store, self.label_encoders = store, label_encoders
+                    self._train_rows = self._test_rows = None
+                self.train_model(df, params=leaderboard[0]["params"])
+            return leaderboard
+        except Exception as e:
+            logger.error(f"Error in search_hyperparameters: {e}")
+            return []
+
+    @staticmethod
+    def _leaderboard_entry(params, fold_scores, fit_seconds):
+        entry = {"params": params, "folds": len(fold_scores), "fit_seconds": round(fit_seconds, 3)}
+        for name in ("MAE", "MSE", "RMSE", "R2"):
+            entry[name] = float(np.mean([scores[name] for scores in fold_scores]))
+        return entry
+
+    @staticmethod
+    def _save_leaderboard(leaderboard, leaderboard_path):
+        if not leaderboard_path:
+            return
+        with open(leaderboard_path, "w", encoding="utf-8") as f:
+            json.dump(leaderboard, f, indent=2)
+
+    @staticmethod
+    def _build_product_catalog(df):
+        # One entry per product and size with its category and typical price, so a
+        # saved model can forecast the menu without access to the sales table
+        aggregations = dict(
+            pizza_category=('pizza_category', 'first'),
+            unit_price=('unit_price', 'median'),
+            unit_cost=('unit_cost', 'median'),
+        )
+        if 'pizza_ingredients' in df.columns:
+            # Lets forecasts of a saved model be rolled up into ingredient demand
+            aggregations['pizza_ingredients'] = ('pizza_ingredients', 'first')
+        # Cost of goods per pizza, used by the price optimizer's margin
+        df = df.assign(unit_cost=df['total_cost'] / df['quantity'].where(df['quantity'] > 0))
+        catalog = df.groupby(['pizza_name', 'pizza_size'], observed=True).agg(**aggregations).reset_index()
+        return catalog.to_dict('records')
+
+    def save_model(self, path, include_estimator=True):
+        if self.compact_forest is None:
+            logger.error("Model is not trained. Nothing to save.")
+            return False
+        try:
+            artifact = {
+                "model_version": self.model_version,
+                "rf_model": self.rf_model if include_estimator else None,
+                "compact_forest": self.compact_forest,
+                "label_encoders": self.label_encoders,
+                "feature_columns": self.feature_columns,
+                "feature_importances": self.feature_importances,
+                "permutation_importances": self.permutation_importances,
+                "training_sketch": self.training_sketch,
+                "metrics": self.metrics,
+                "product_catalog": self.product_catalog,
+                "leaderboard": self.leaderboard,
+            }
+            joblib.dump(artifact, path)
+            logger.info(f"Model saved to {path}.")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving model: {e}")
+            return False
+
+    def load_model(self, path):
+        try:
+            artifact = joblib.load(path)
+            self.model_version = artifact["model_version"]
+            self.rf_model = artifact["rf_model"]
+            self.compact_forest = artifact["compact_forest"]
+            self.label_encoders = artifact["label_encoders"]
+            self.feature_columns = artifact["feature_columns"]
+            self.feature_importances = artifact["feature_importances"]
+            self.permutation_importances = artifact.get("permutation_importances")
+            self.training_sketch = artifact.get("training_sketch")
+            self.metrics = artifact["metrics"]
+            self.product_catalog = artifact["product_catalog"]
+            self.leaderboard = artifact.get("leaderboard", [])
+            # Cached matrix and predictions belong to whatever model was here before
+            self.feature_store = None
+            self._train_rows = self._test_rows = None
+            self._split_value_forest = None
+            self.prediction_cache.clear()
+            logger.info(f"Model loaded from {path} (version {self.model_version}).")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading model: {e}")
+            return False
+
+    def compact_model(self, keep_estimator=False):
+        if self.rf_model is None:
+            logger.error("Model is not trained. Nothing to compact.")
+            return False
+        self.compact_forest = CompactForest.from_forest(self.rf_model)
+        logger.info(f"Model compacted to {self.compact_forest.nbytes} bytes "
+                    f"({self.compact_forest.n_trees} trees).")
+        if not keep_estimator:
+            self.rf_model = None
+        return True
+
+    def model_footprint(self):
+        footprint = {}
+        if self.rf_model is not None:
+            sklearn_bytes = []
+            for estimator in self.rf_model.estimators_:
+                state = estimator.tree_.__getstate__()
+                sklearn_bytes.append(state["nodes"].nbytes + state["values"].nbytes)
+            footprint["sklearn_bytes_per_tree"] = sklearn_bytes
+            footprint["sklearn_total_bytes"] = int(sum(sklearn_bytes))
+        if self.compact_forest is not None:
+            compact_bytes = self.compact_forest.bytes_per_tree()
+            footprint["compact_bytes_per_tree"] = compact_bytes.tolist()
+            footprint["compact_total_bytes"] = self.compact_forest.nbytes
+        return footprint
+
+    def export_node_table(self):
+        if self.compact_forest is None:
+            logger.error("Model is not trained. Nothing to export.")
+            return None
+        return self.compact_forest.node_table()
+
+    def _predict_matrix(self, X):
+        # X columns follow self.feature_columns
+        with span("model.predict"):
+            if self.compact_forest is not None:
+                return self.compact_forest.predict(X)
+            return self.rf_model.predict(X)
+
+    def _packed_forest(self, split_values=False):
+        # A full estimator is packed into a CompactForest once per model version; the served
+        # forest usually lacks split values, so contributions get their own packed copy
+        if self.compact_forest is not None and (not split_values or self.compact_forest.split_value is not None):
+            return self.compact_forest
+        if self._split_value_forest is None or self._split_value_forest[0] != self.model_version:
+            if self.rf_model is None:
+                raise ValueError("Contributions need the full estimator; this model was saved compacted only.")
+            self._split_value_forest = (self.model_version, CompactForest.from_forest(self.rf_model, split_values=True))
+        return self._split_value_forest[1]
+
+    def _predict_tree_matrix(self, X):
+        # Every tree's output for the whole batch as one (n_trees, n_rows) array
+        forest = self._packed_forest()
+        with span("model.predict_trees"):
+            tree_values = forest.predict_trees(X)
+        return tree_values, forest.mean_of_trees(tree_values)
+
+    def _predict_matrix_cached(self, X):
+        keys = [(self.model_version, row.tobytes()) for row in X]
+        out = np.empty(len(keys), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.prediction_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                out[i] = cached
+
+        if missing:
+            out[missing] = self._predict_matrix(X[missing])
+            for i in missing:
+                self.prediction_cache.put(keys[i], out[i])
+        return out
+
+    def _predict_band_cached(self, X, quantiles):
+        # Point estimate plus quantiles of the per-tree predictions, one row of
+        # [mean, *quantiles] per input row. Cached like _predict_matrix_cached, with the
+        # quantiles in the key; only rows missing from the cache go through the trees.
+        quantiles = tuple(float(q) for q in quantiles)
+        keys = [(self.model_version, row.tobytes(), quantiles) for row in X]
+        out = np.empty((len(keys), 1 + len(quantiles)), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.prediction_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                out[i] = cached
+
+        if missing:
+            tree_values, means = self._predict_tree_matrix(X[missing])
+            out[missing, 0] = means
+            out[missing, 1:] = np.quantile(tree_values, quantiles, axis=0).T
+            for i in missing:
+                self.prediction_cache.put(keys[i], out[i].copy())
+                # The mean is the forest's point prediction; plain predictions can reuse it
+                self.prediction_cache.put(keys[i][:2], out[i, 0])
+        return out
+
+    def get_cache_stats(self):
+        return self.prediction_cache.stats()
+
     def get_metrics(self):
         return self.metrics
 
     def get_feature_importances(self):
         return self.feature_importances
 
-    def predict_quantity(self, product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount,
-                         from_date, to_date):
-        print("Starting predict_quantity...")
-        if self.rf_model is None:
-            print("Error: Model is not trained. Cannot make predictions.")
-            return []
+    def get_permutation_importances(self, n_repeats=5, n_jobs=None, max_rows=PERMUTATION_MAX_ROWS,
+                                    random_state=42, progress=None):
+        # MAE increase when one feature column is shuffled, as {feature: {"mean", "std"}}.
+        # Features x repeats are scored in worker processes; results are cached per model version.
+        settings = {"model_version": self.model_version, "n_repeats": n_repeats, "max_rows": max_rows,
+                    "random_state": random_state}
+        cached = self.permutation_importances
+        if cached is not None and all(cached.get(key) == value for key, value in settings.items()):
+            return cached["importances"]
+        if self.compact_forest is None:
+            logger.error("Model is not trained. No permutation importances.")
+            return None
+        if self.feature_store is None or self._train_rows is None:
+            logger.error("Permutation importance needs the training data; train the model first.")
+            return None
 
         try:
-            print(f"Inputs: product={product}, time_period={time_period}, is_holiday={is_holiday}, "
-                  f"pizza_category={pizza_category}, pizza_size={pizza_size}, unit_price={unit_price}, "
-                  f"discount={discount}, from_date={from_date}, to_date={to_date}")
-
-            time_period_mapping = {'Morning': 1, 'Afternoon': 2, 'Evening': 4}
-            if time_period not in time_period_mapping:
-                print(f"Invalid time_period value: {time_period}. Using default value 0.")
-                time_period_value = 0
+            store = self.feature_store
+            held_out = self._test_rows is not None
+            if held_out:
+                rows = self._test_rows
             else:
-                time_period_value = time_period_mapping[time_period]
-            print(f"Time period mapped value: {time_period_value}")
+                # timeseries_cv refits on all history, so nothing is held out; the newest
+                # block of dates is the closest stand-in
+                rows = store.date_folds(5)[-1][1]
+                logger.warning("No held-out rows (model trained with timeseries_cv); "
+                               "permutation importance uses the newest dates, which the model has seen.")
+            X, y = store.take(rows)
+            if len(y) > max_rows:
+                sample = np.sort(np.random.default_rng(random_state).choice(len(y), max_rows, replace=False))
+                X, y = X[sample], y[sample]
+
+            forest = self._packed_forest()
+            baseline = score_predictions(y, forest.predict(X))["MAE"]
+            features = list(self.feature_columns)
+            increases = {i: [] for i in range(len(features))}
+            total = len(features) * n_repeats
+            with span("model.permutation_importance"), ProcessPoolExecutor(
+                    max_workers=n_jobs, initializer=_init_importance_worker, initargs=(forest, X, y)) as executor:
+                futures = [executor.submit(_permuted_mae, i, [random_state, i, repeat])
+                           for i in range(len(features)) for repeat in range(n_repeats)]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    feature_index, mae = future.result()
+                    increases[feature_index].append(mae - baseline)
+                    if progress is not None:
+                        progress(done, total)
+
+            importances = {features[i]: {"mean": float(np.mean(values)), "std": float(np.std(values))}
+                           for i, values in increases.items()}
+            importances = dict(sorted(importances.items(), key=lambda item: item[1]["mean"], reverse=True))
+            for feature, importance in importances.items():
+                logger.debug("Permutation importance %s: %.4f +/- %.4f", feature, importance["mean"],
+                             importance["std"])
+            self.permutation_importances = dict(settings, held_out=held_out, rows=len(y),
+                                                baseline_MAE=float(baseline), importances=importances)
+            return importances
+        except Exception as e:
+            logger.error(f"Error in get_permutation_importances: {e}")
+            return None
 
-            is_holiday_val = 1 if is_holiday else 0
-            print(f"Is holiday value: {is_holiday_val}")
+    def encode_prediction_inputs(self, product, time_period, is_holiday, pizza_category, pizza_size, unit_price,
+                                 discount, from_date, to_date):
+        # Returns (date_range, feature matrix, total_cost) or None if an encoder is missing
+        time_period_mapping = {'Morning': 1, 'Afternoon': 2, 'Evening': 4}
+        if time_period not in time_period_mapping:
+            logger.warning(f"Invalid time_period value: {time_period}. Using default value 0.")
+            time_period_value = 0
+        else:
+            time_period_value = time_period_mapping[time_period]
+        logger.debug("Time period mapped value: %s", time_period_value)
+
+        is_holiday_val = 1 if is_holiday else 0
+        logger.debug("Is holiday value: %s", is_holiday_val)
+
+        date_range = pd.date_range(start=from_date, end=to_date, freq="D")
+        logger.debug("Date range: %s - %s (%d days)", from_date, to_date, len(date_range))
+
+        unit_price_val = float(unit_price) if unit_price else 0.0
+        discount_val = float(discount) if discount else 0.0
+        total_cost = unit_price_val * (1 - discount_val)
+        logger.debug("Unit price: %s, Discount: %s, Total cost: %s", unit_price_val, discount_val, total_cost)
+
+        # Encode input parameters directly
+        logger.debug("Encoding input parameters...")
+        if 'pizza_name' not in self.label_encoders:
+            logger.error("LabelEncoder for pizza_name not found.")
+            return None
+        logger.debug("Available pizza_name classes: %s", self.label_encoders['pizza_name'].classes_)
+        if product not in self.label_encoders['pizza_name'].classes_:
+            logger.warning(
+                f"Product '{product}' not seen during training. Using first class: {self.label_encoders['pizza_name'].classes_[0]}")
+            product = self.label_encoders['pizza_name'].classes_[0]
+        pizza_name_encoded = self.label_encoders['pizza_name'].transform([product])[0]
+        logger.debug("Encoded pizza_name: %s", pizza_name_encoded)
+
+        if 'pizza_size' not in self.label_encoders:
+            logger.error("LabelEncoder for pizza_size not found.")
+            return None
+        logger.debug("Available pizza_size classes: %s", self.label_encoders['pizza_size'].classes_)
+        pizza_size_str = str(pizza_size)
+        if pizza_size_str not in self.label_encoders['pizza_size'].classes_:
+            logger.warning(
+                f"Pizza size '{pizza_size_str}' not seen during training. Using first class: {self.label_encoders['pizza_size'].classes_[0]}")
+            pizza_size_str = self.label_encoders['pizza_size'].classes_[0]
+        pizza_size_encoded = self.label_encoders['pizza_size'].transform([pizza_size_str])[0]
+        logger.debug("Encoded pizza_size: %s", pizza_size_encoded)
+
+        if 'pizza_category' not in self.label_encoders:
+            logger.error("LabelEncoder for pizza_category not found.")
+            return None
+        logger.debug("Available pizza_category classes: %s", self.label_encoders['pizza_category'].classes_)
+        pizza_category_str = str(pizza_category)
+        if pizza_category_str not in self.label_encoders['pizza_category'].classes_:
+            logger.warning(
+                f"Pizza category '{pizza_category_str}' not seen during training. Using first class: {self.label_encoders['pizza_category'].classes_[0]}")
+            pizza_category_str = self.label_encoders['pizza_category'].classes_[0]
+        pizza_category_encoded = self.label_encoders['pizza_category'].transform([pizza_category_str])[0]
+        logger.debug("Encoded pizza_category: %s", pizza_category_encoded)
+
+        if 'time_period' not in self.label_encoders:
+            logger.error("LabelEncoder for time_period not found.")
+            return None
+        logger.debug("Available time_period classes: %s", self.label_encoders['time_period'].classes_)
+        time_period_str = str(time_period_value)
+        if time_period_str not in self.label_encoders['time_period'].classes_:
+            logger.warning(
+                f"Time period '{time_period_str}' not seen during training. Using first class: {self.label_encoders['time_period'].classes_[0]}")
+            time_period_str = self.label_encoders['time_period'].classes_[0]
+        time_period_encoded = self.label_encoders['time_period'].transform([time_period_str])[0]
+        logger.debug("Encoded time_period: %s", time_period_encoded)
+
+        # Build the whole date range as one feature matrix so it is evaluated in a
+        # single pass instead of one DataFrame + predict call per day.
+        feature_values = {
+            'unit_price': unit_price_val,
+            'discount': discount_val,
+            'total_price': unit_price_val * (1 - discount_val),
+            'pizza_size': pizza_size_encoded,
+            'pizza_category': pizza_category_encoded,
+            'pizza_name': pizza_name_encoded,
+            'total_cost': total_cost,
+            'is_holiday': is_holiday_val,
+            'time_period': time_period_encoded,
+            'day': date_range.day,
+            'month': date_range.month,
+            'year': date_range.year,
+            'day_of_week': date_range.dayofweek
+        }
+        input_data = np.empty((len(date_range), len(self.feature_columns)), dtype=np.float32)
+        for i, col in enumerate(self.feature_columns):
+            input_data[:, i] = feature_values[col]
+        return date_range, input_data, total_cost
+
+    def catalog_entry(self, product, pizza_size):
+        for entry in self.product_catalog:
+            if entry['pizza_name'] == product and str(entry['pizza_size']) == str(pizza_size):
+                return entry
+        return None
+
+    def optimize_price(self, product, time_period, is_holiday, pizza_category, pizza_size, from_date, to_date,
+                       prices=None, discounts=None, unit_cost=None, objective="revenue"):
+        # Sweeps every (unit_price, discount) pair over the date range in one batched evaluation.
+        # Returns (best scenario as a dict, surface DataFrame with one row per pair), or None.
+        if objective not in OPTIMIZER_OBJECTIVES:
+            raise ValueError(f"Unknown objective '{objective}'. Available objectives: {list(OPTIMIZER_OBJECTIVES)}")
+        if self.rf_model is None and self.compact_forest is None:
+            logger.error("Model is not trained. Cannot optimize prices.")
+            return None
+        try:
+            entry = self.catalog_entry(product, pizza_size) or {}
+            if prices is None:
+                if 'unit_price' not in entry:
+                    logger.error(f"No catalog price for '{product}' ({pizza_size}); pass prices explicitly.")
+                    return None
+                prices = np.round(entry['unit_price'] * np.linspace(*PRICE_GRID_RANGE, 41), 2)
+            prices = np.unique(np.asarray(prices, dtype=np.float64))
+            discounts = np.unique(np.asarray(DEFAULT_DISCOUNT_GRID if discounts is None else discounts,
+                                             dtype=np.float64))
+            if unit_cost is None:
+                unit_cost = entry.get('unit_cost', np.nan)
+            if objective == "margin" and np.isnan(unit_cost):
+                logger.error(f"No unit cost known for '{product}' ({pizza_size}); pass unit_cost explicitly.")
+                return None
+
+            encoded = self.encode_prediction_inputs(product, time_period, is_holiday, pizza_category, pizza_size,
+                                                    prices[0], discounts[0], from_date, to_date)
+            if encoded is None:
+                return None
+            date_range, base, _ = encoded
+            n_days = len(date_range)
+
+            # Scenario s covers rows s * n_days ... (s + 1) * n_days - 1 of the stacked matrix
+            grid_price, grid_discount = (a.ravel() for a in np.meshgrid(prices, discounts, indexing="ij"))
+            net_price = grid_price * (1 - grid_discount)
+            scenario_columns = {'unit_price': grid_price, 'discount': grid_discount,
+                                'total_price': net_price, 'total_cost': net_price}
+            # Inputs that fall between the same split thresholds take identical paths through
+            # every tree, so only one representative per group of scenarios and of days is
+            # evaluated; each representative day is weighted by how many days it stands for
+            forest = self._packed_forest()
+            bins = np.column_stack([forest.split_bins(self.feature_columns.index(col), values)
+                                    for col, values in scenario_columns.items()])
+            _, representatives, group = np.unique(bins, axis=0, return_index=True, return_inverse=True)
+            day_bins = np.column_stack([forest.split_bins(i, base[:, i]) for i in range(base.shape[1])])
+            _, day_representatives, day_group = np.unique(day_bins, axis=0, return_index=True, return_inverse=True)
+            day_weights = np.bincount(day_group.ravel(), minlength=len(day_representatives))
+            base = base[day_representatives]
+
+            scenarios_per_chunk = max(1, OPTIMIZER_CHUNK_ROWS // len(base))
+            group_quantities = np.empty(len(representatives), dtype=np.float64)
+            with span("model.optimize_price"):
+                for start in range(0, len(representatives), scenarios_per_chunk):
+                    chunk = representatives[start:start + scenarios_per_chunk]
+                    X = np.tile(base, (len(chunk), 1))
+                    for col, values in scenario_columns.items():
+                        X[:, self.feature_columns.index(col)] = np.repeat(values[chunk], len(base))
+                    daily = np.maximum(0, forest.predict(X)).reshape(len(chunk), len(base))
+                    group_quantities[start:start + len(chunk)] = daily @ day_weights
+            quantities = group_quantities[group.ravel()]
+            logger.debug("Evaluated %d x %d distinct of %d x %d scenario x day inputs.", len(representatives),
+                         len(base), len(grid_price), n_days)
+
+            surface = pd.DataFrame({
+                'unit_price': grid_price,
+                'discount': grid_discount,
+                'net_price': net_price,
+                'quantity': quantities,
+                'revenue': quantities * net_price,
+                'margin': quantities * (net_price - unit_cost),
+            })
+            best = surface.iloc[int(surface[objective].to_numpy().argmax())].to_dict()
+            best.update(product=product, pizza_size=pizza_size, objective=objective, days=n_days)
+            logger.info(f"Best {objective} for {product} ({pizza_size}) over {len(surface)} scenarios: "
+                        f"unit_price={best['unit_price']:.2f}, discount={best['discount']:.2f}, "
+                        f"{objective}={best[objective]:.2f}")
+            return best, surface
+        except Exception as e:
+            logger.error(f"Error in optimize_price: {e}")
+            return None
 
-            date_range = pd.date_range(start=from_date, end=to_date, freq="D")
-            print(f"Date range: {date_range}")
+    def explain_prediction(self, product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount,
+                           from_date, to_date):
+        # One row per date: bias + one contribution per feature, summing to the unclipped prediction
+        if self.rf_model is None and self.compact_forest is None:
+            logger.error("Model is not trained. Cannot explain predictions.")
+            return None
+        try:
+            encoded = self.encode_prediction_inputs(product, time_period, is_holiday, pizza_category, pizza_size,
+                                                    unit_price, discount, from_date, to_date)
+            if encoded is None:
+                return None
+            date_range, input_data, _ = encoded
+            with span("model.explain"):
+                bias, contributions = self._packed_forest(split_values=True).decompose(input_data)
+            explanation = pd.DataFrame(contributions, index=pd.DatetimeIndex(date_range, name="date"),
+                                       columns=self.feature_columns)
+            explanation.insert(0, "bias", bias)
+            explanation["prediction"] = bias + contributions.sum(axis=1)
+            return explanation
+        except Exception as e:
+            logger.error(f"Error in explain_prediction: {e}")
+            return None
 
-            unit_price_val = float(unit_price) if unit_price else 0.0
-            discount_val = float(discount) if discount else 0.0
-            total_cost = unit_price_val * (1 - discount_val)
-            print(f"Unit price: {unit_price_val}, Discount: {discount_val}, Total cost: {total_cost}")
+    def predict_quantity(self, product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount,
+                         from_date, to_date, quantiles=None):
+        # With quantiles, e.g. (0.1, 0.9), each tuple also carries those quantiles of the per-tree predictions
+        logger.debug("Starting predict_quantity...")
+        if self.rf_model is None and self.compact_forest is None:
+            logger.error("Model is not trained. Cannot make predictions.")
+            return []
 
-            # Encode input parameters directly
-            print("Encoding input parameters...")
-            if 'pizza_name' not in self.label_encoders:
-                print("Error: LabelEncoder for pizza_name not found.")
-                return []
-            print(f"Available pizza_name classes: {self.label_encoders['pizza_name'].classes_}")
-            if product not in self.label_encoders['pizza_name'].classes_:
-                print(
-                    f"Warning: Product '{product}' not seen during training. Using first class: {self.label_encoders['pizza_name'].classes_[0]}")
-                product = self.label_encoders['pizza_name'].classes_[0]
-            pizza_name_encoded = self.label_encoders['pizza_name'].transform([product])[0]
-            print(f"Encoded pizza_name: {pizza_name_encoded}")
-
-            if 'pizza_size' not in self.label_encoders:
-                print("Error: LabelEncoder for pizza_size not found.")
-                return []
-            print(f"Available pizza_size classes: {self.label_encoders['pizza_size'].classes_}")
-            pizza_size_str = str(pizza_size)
-            if pizza_size_str not in self.label_encoders['pizza_size'].classes_:
-                print(
-                    f"Warning: Pizza size '{pizza_size_str}' not seen during training. Using first class: {self.label_encoders['pizza_size'].classes_[0]}")
-                pizza_size_str = self.label_encoders['pizza_size'].classes_[0]
-            pizza_size_encoded = self.label_encoders['pizza_size'].transform([pizza_size_str])[0]
-            print(f"Encoded pizza_size: {pizza_size_encoded}")
-
-            if 'pizza_category' not in self.label_encoders:
-                print("Error: LabelEncoder for pizza_category not found.")
-                return []
-            print(f"Available pizza_category classes: {self.label_encoders['pizza_category'].classes_}")
-            pizza_category_str = str(pizza_category)
-            if pizza_category_str not in self.label_encoders['pizza_category'].classes_:
-                print(
-                    f"Warning: Pizza category '{pizza_category_str}' not seen during training. Using first class: {self.label_encoders['pizza_category'].classes_[0]}")
-                pizza_category_str = self.label_encoders['pizza_category'].classes_[0]
-            pizza_category_encoded = self.label_encoders['pizza_category'].transform([pizza_category_str])[0]
-            print(f"Encoded pizza_category: {pizza_category_encoded}")
-
-            if 'time_period' not in self.label_encoders:
-                print("Error: LabelEncoder for time_period not found.")
+        try:
+            logger.debug("Inputs: product=%s, time_period=%s, is_holiday=%s, pizza_category=%s, pizza_size=%s, "
+                         "unit_price=%s, discount=%s, from_date=%s, to_date=%s", product, time_period, is_holiday,
+                         pizza_category, pizza_size, unit_price, discount, from_date, to_date)
+
+            with span("model.encode_inputs"):
+                encoded = self.encode_prediction_inputs(product, time_period, is_holiday, pizza_category,
+                                                        pizza_size, unit_price, discount, from_date, to_date)
+            if encoded is None:
                 return []
-            print(f"Available time_period classes: {self.label_encoders['time_period'].classes_}")
-            time_period_str = str(time_period_value)
-            if time_period_str not in self.label_encoders['time_period'].classes_:
-                print(
-                    f"Warning: Time period '{time_period_str}' not seen during training. Using first class: {self.label_encoders['time_period'].classes_[0]}")
-                time_period_str = self.label_encoders['time_period'].classes_[0]
-            time_period_encoded = self.label_encoders['time_period'].transform([time_period_str])[0]
-            print(f"Encoded time_period: {time_period_encoded}")
-
-            predictions = []
-            for date in date_range:
-                day = date.day
-                month_val = date.month
-                year_val = date.year
-                day_of_week = date.dayofweek
-
-                input_data = pd.DataFrame({
-                    'unit_price': [unit_price_val],
-                    'discount': [discount_val],
-                    'total_price': [unit_price_val * (1 - discount_val)],
-                    'pizza_size': [pizza_size_encoded],
-                    'pizza_category': [pizza_category_encoded],
-                    'pizza_name': [pizza_name_encoded],
-                    'total_cost': [total_cost],
-                    'is_holiday': [is_holiday_val],
-                    'time_period': [time_period_encoded],
-                    'day': [day],
-                    'month': [month_val],
-                    'year': [year_val],
-                    'day_of_week': [day_of_week]
-                })
-
-                predicted_quantity = self.rf_model.predict(input_data)[0]
-                predicted_quantity = max(0, predicted_quantity)
-                predictions.append(
-                    (date, predicted_quantity, pizza_category, pizza_size, unit_price, discount, total_cost))
-
-            print(f"Predictions generated: {len(predictions)} entries")
+            date_range, input_data, total_cost = encoded
+
+            if quantiles:
+                banded = np.maximum(0, self._predict_band_cached(input_data, quantiles))
+                predicted_quantities, bands = banded[:, 0], banded[:, 1:]
+                predictions = [(date, predicted_quantity, pizza_category, pizza_size, unit_price, discount, total_cost,
+                                *band)
+                               for date, predicted_quantity, band in zip(date_range, predicted_quantities, bands)]
+            else:
+                predicted_quantities = np.maximum(0, self._predict_matrix_cached(input_data))
+                predictions = [(date, predicted_quantity, pizza_category, pizza_size, unit_price, discount, total_cost)
+                               for date, predicted_quantity in zip(date_range, predicted_quantities)]
+
+            logger.debug("Predictions generated: %d entries", len(predictions))
             return predictions
 
         except Exception as e:
-            print(f"Error in predict_quantity: {str(e)}")
+            logger.error(f"Error in predict_quantity: {str(e)}")
             return []
\ No newline at end of file
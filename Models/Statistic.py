@@ -1,71 +1,308 @@
+from Connectors.Backend import DEFAULT_CHUNK_ROWS, TABLE_SCHEMAS, numpy_schema, select_sql
 from Connectors.Connector import Connector
+from Connectors.NormalizedSchema import decode_sales
+from .IngredientDemand import IngredientMatrix
 from .PredictionModel import PredictionModel
+from .StreamingProfile import StreamingProfile, profile_chunks
+from .Telemetry import get_logger, span, telemetry
+import logging
+import os
+import numpy as np
 import pandas as pd
 
+logger = get_logger("statistic")
+
+# Coarser levels of the rollup pyramid; each bucket is labelled by its period's first day
+ROLLUP_FREQS = {"week": "W-SUN", "month": "M", "quarter": "Q"}
+RESOLUTIONS = ("day",) + tuple(ROLLUP_FREQS)
+# The statistics tab asks for "auto" and gets the finest level with at most this many points
+MAX_CHART_POINTS = 60
+LEADERBOARD_METRICS = ("revenue", "cost", "margin", "quantity")
+
 class Statistic(Connector):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, autoload=True, table_name=None, backend=None, path=None):
+        super().__init__(backend=backend, path=path)
+        # 'pizza_data' (flat) or 'pizza_sales' (normalized, decoded through the pizza dimension)
+        self.table_name = table_name or os.environ.get("PIZZA_DB_TABLE", "pizza_data")
+        self.pizza_dimension = None
+        self.df = None
+        self.original_df = None
+        self.daily_totals = None
+        self.rollups = {}
+        self.watermark = None
+        self.model_watermark = None
+        self.ingredient_matrix = None
+        self.model = PredictionModel()
+        self.drift_monitor = None
+        # autoload=False lets the UI run load() on a background thread
+        if autoload:
+            self.load()
+
+    def load(self):
         self.cursor = self.connect()
-        self.df = self.load_data('pizza_data')
+        self.df = self.load_data(self.table_name)
         self.original_df = self.df.copy() if self.df is not None else None
-        self.model = PredictionModel()
         self.model.set_original_data(self.original_df)
+        self.daily_totals = self._daily_totals(self.original_df)
+        self.rollups = {level: self._rollup(self.daily_totals, level) for level in ROLLUP_FREQS}
+        self.watermark = self._watermark(self.df)
+        return self
+
+    def refresh(self):
+        # Appends rows newer than the (order_date, order_id) watermark; assumes order_id grows with time
+        if self.df is None:
+            self.load()
+            return len(self.df)
+        last_date, last_id = self.watermark
+        day = last_date.strftime("%Y-%m-%d")
+        with span("statistic.refresh"):
+            new_rows = self._query_rows(self.table_name,
+                                        " WHERE order_date > %s OR (order_date = %s AND order_id > %s)",
+                                        (day, day, last_id))
+            if new_rows is None:
+                return 0
+            for col, dtype in self.df.dtypes.items():
+                if isinstance(dtype, pd.CategoricalDtype):
+                    continue
+                try:
+                    new_rows[col] = new_rows[col].astype(dtype)
+                except (TypeError, ValueError):
+                    logger.warning(f"New rows in column '{col}' do not fit dtype {dtype}; "
+                                   f"keeping {new_rows[col].dtype}.")
+            self._check_invalid_values(new_rows)
+
+            # Build the new state aside and swap it in at the end, so readers on other
+            # threads never see a frame that does not match its totals
+            df = self._append_rows(self.df, new_rows)
+            original_df = self._append_rows(self.original_df, new_rows)
+            model_df = self.model.original_df
+            if model_df is not None:
+                model_df = self._append_rows(model_df, new_rows)
+            # Only the days touched by the delta change; earlier days keep their totals
+            new_days = self._daily_totals(new_rows)
+            daily_totals = self.daily_totals.add(new_days, fill_value=0).astype(self.daily_totals.dtypes.to_dict())
+            rollups = {level: totals.add(self._rollup(new_days, level), fill_value=0).astype(totals.dtypes.to_dict())
+                       for level, totals in self.rollups.items()}
+            watermark = self._watermark(df)
+            self.df, self.original_df, self.model.original_df = df, original_df, model_df
+            self.daily_totals, self.rollups, self.watermark = daily_totals, rollups, watermark
+            if self.ingredient_matrix is not None and not all(
+                    name in self.ingredient_matrix for name in new_rows["pizza_name"].unique()):
+                self.ingredient_matrix = None
+            if self.drift_monitor is not None:
+                try:
+                    self.drift_monitor.update(*self.model.drift_features(new_rows))
+                except Exception as e:
+                    logger.error(f"Could not add new rows to the drift monitor: {e}")
+        logger.info(f"Refreshed {self.table_name}: {len(new_rows)} new records, {len(self.df)} in total.")
+        return len(new_rows)
+
+    @staticmethod
+    def _append_rows(df, new_rows):
+        combined = pd.concat([df, new_rows], ignore_index=True)
+        # Categorical columns from the pizza dimension may have gained menu items
+        for col, dtype in df.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype) and not isinstance(combined[col].dtype, pd.CategoricalDtype):
+                combined[col] = pd.api.types.union_categoricals([df[col], new_rows[col].astype("category")])
+        return combined
+
+    @staticmethod
+    def _watermark(df):
+        last_date = df["order_date"].max()
+        return last_date, int(df.loc[df["order_date"] == last_date, "order_id"].max())
+
+    @staticmethod
+    def _daily_totals(df):
+        return df.groupby(["pizza_name", "order_date"], observed=True).agg({
+            "total_price": "sum",
+            "total_cost": "sum",
+            "quantity": "sum"
+        }).sort_index()
+
+    @staticmethod
+    def _rollup(daily, level):
+        dates = daily.index.get_level_values("order_date")
+        starts = pd.Index(dates.to_period(ROLLUP_FREQS[level]).start_time, name="order_date")
+        return daily.groupby([daily.index.get_level_values("pizza_name"), starts], observed=True).sum().sort_index()
 
     def load_data(self, table_name):
-        print(f"Loading data from table '{table_name}'...")
-        sql = f"SELECT * FROM {table_name};"
-        df = self.queryDataset(sql)
-        if df is not None:
-            print(f"Loaded {len(df)} records from the '{table_name}' table.")
-            print("Columns in DataFrame:", df.columns.tolist())
-            print("Unique values in pizza_name:", df["pizza_name"].unique())
-            print("Unique values in pizza_category:", df["pizza_category"].unique())
-            print("Unique values in pizza_size:", df["pizza_size"].unique())
-            print("Unique values in unit_price:", df["unit_price"].unique())
-            print("Unique values in discount:", df["discount"].unique())
-            print("Unique values in quantity:", df["quantity"].unique())
-            print("Unique values in is_holiday:", df["is_holiday"].unique())
-            print("Unique values in time_period:", df["time_period"].unique())
-            print("Distribution of quantity:")
-            print(df["quantity"].value_counts())
-            print("Average quantity by pizza_name:")
-            print(df.groupby("pizza_name")["quantity"].mean())
-            print("Average quantity by time_period:")
-            print(df.groupby("time_period")["quantity"].mean())
-            print("Average quantity by is_holiday:")
-            print(df.groupby("is_holiday")["quantity"].mean())
-            print("Average quantity by unit_price:")
-            print(df.groupby("unit_price")["quantity"].mean())
-            print("Average quantity by discount:")
-            print(df.groupby("discount")["quantity"].mean())
-            print("Correlation with quantity:")
-            print(df[['quantity', 'pizza_category', 'pizza_size', 'unit_price', 'discount', 'total_cost', 'is_holiday', 'time_period']].corr()['quantity'])
-            if (df["total_cost"] < 0).any():
-                print("Warning: Negative total_cost values detected in the database:")
-                print(df[df["total_cost"] < 0][["order_date", "pizza_name", "total_cost"]])
-            if (df["unit_price"] < 0).any():
-                print("Warning: Negative unit_price values detected:")
-                print(df[df["unit_price"] < 0][["order_date", "pizza_name", "unit_price"]])
-            if (df["quantity"] < 0).any():
-                print("Warning: Negative quantity values detected:")
-                print(df[df["quantity"] < 0][["order_date", "pizza_name", "quantity"]])
-            if (df["discount"] < 0).any() or (df["discount"] > 1).any():
-                print("Warning: Invalid discount values detected (should be between 0 and 1):")
-                print(df[(df["discount"] < 0) | (df["discount"] > 1)][["order_date", "pizza_name", "discount"]])
-
-            try:
-                df['order_date'] = pd.to_datetime(df['order_date'])
-            except Exception as e:
-                print(f"Error converting order_date to datetime: {e}")
-                raise ValueError("Failed to convert order_date to datetime format.")
+        logger.info(f"Loading data from table '{table_name}'...")
+        with span("statistic.load_data"):
+            df = self._query_rows(table_name)
+            if df is None:
+                logger.error(f"Failed to load data from table '{table_name}'.")
+                raise ValueError(f"Không thể truy xuất dữ liệu từ bảng {table_name}. Hãy kiểm tra lại tên bảng hoặc kết nối DB.")
+
+            logger.info(f"Loaded {len(df)} records from the '{table_name}' table.")
+            # The profile below scans the whole frame several times; only build it when asked for
+            if logger.isEnabledFor(logging.DEBUG):
+                with span("statistic.profile"):
+                    self._log_data_profile(df)
+            self._check_invalid_values(df)
+
+            if not pd.api.types.is_datetime64_any_dtype(df['order_date']):
+                try:
+                    df['order_date'] = pd.to_datetime(df['order_date'])
+                except Exception as e:
+                    logger.error(f"Error converting order_date to datetime: {e}")
+                    raise ValueError("Failed to convert order_date to datetime format.")
 
             return df
-        else:
-            print(f"Failed to load data from table '{table_name}'.")
-            raise ValueError(f"Không thể truy xuất dữ liệu từ bảng {table_name}. Hãy kiểm tra lại tên bảng hoặc kết nối DB.")
 
-    def train_model(self, train_size=0.8):
-        return self.model.train_model(self.df, train_size=train_size)
+    def _query_rows(self, table_name, where="", params=None):
+        if table_name == "pizza_sales":
+            schema = numpy_schema(table_name)
+            sales = self.queryTypedDataset(select_sql(table_name, schema) + where, schema, params)
+            if sales is None:
+                return None
+            if self.pizza_dimension is None or not np.isin(sales["pizza_key"].unique(),
+                                                           self.pizza_dimension["pizza_key"]).all():
+                dimension_schema = numpy_schema("pizza")
+                self.pizza_dimension = self.queryTypedDataset(
+                    select_sql("pizza", dimension_schema) + " ORDER BY pizza_key", dimension_schema)
+            return decode_sales(sales, self.pizza_dimension)
+        if table_name in TABLE_SCHEMAS:
+            # Decoded straight into typed columns, order_date already datetime64
+            schema = numpy_schema(table_name)
+            return self.queryTypedDataset(select_sql(table_name, schema) + where, schema, params)
+        return self.queryDataset(f"SELECT * FROM {table_name}{where};", params)
+
+    @staticmethod
+    def _log_data_profile(df):
+        logger.debug("Columns in DataFrame: %s", df.columns.tolist())
+        StreamingProfile().update(df).log(logger)
+
+    def profile_table(self, table_name=None, chunk_size=DEFAULT_CHUNK_ROWS, n_jobs=None):
+        # Same profile as the debug log of load_data, streamed chunk by chunk so memory
+        # stays flat however large the table is
+        table_name = table_name or self.table_name
+        if table_name not in TABLE_SCHEMAS:
+            logger.error(f"Cannot stream table '{table_name}': no typed schema.")
+            return None
+        if self.conn is None and self.connect() is None:
+            return None
+        with span("statistic.profile_table"):
+            return profile_chunks(self._iter_rows(table_name, chunk_size), n_jobs=n_jobs)
+
+    def _iter_rows(self, table_name, chunk_size):
+        schema = numpy_schema(table_name)
+        chunks = self.iterTypedDataset(select_sql(table_name, schema), schema, chunk_size=chunk_size)
+        if table_name != "pizza_sales":
+            yield from chunks
+            return
+        dimension_schema = numpy_schema("pizza")
+        self.pizza_dimension = self.queryTypedDataset(
+            select_sql("pizza", dimension_schema) + " ORDER BY pizza_key", dimension_schema)
+        if self.pizza_dimension is None:
+            return
+        for sales in chunks:
+            yield decode_sales(sales, self.pizza_dimension)
+
+    @staticmethod
+    def _check_invalid_values(df):
+        if (df["total_cost"] < 0).any():
+            logger.warning("Negative total_cost values detected in the database:\n%s",
+                           df[df["total_cost"] < 0][["order_date", "pizza_name", "total_cost"]])
+        if (df["unit_price"] < 0).any():
+            logger.warning("Negative unit_price values detected:\n%s",
+                           df[df["unit_price"] < 0][["order_date", "pizza_name", "unit_price"]])
+        if (df["quantity"] < 0).any():
+            logger.warning("Negative quantity values detected:\n%s",
+                           df[df["quantity"] < 0][["order_date", "pizza_name", "quantity"]])
+        if (df["discount"] < 0).any() or (df["discount"] > 1).any():
+            logger.warning("Invalid discount values detected (should be between 0 and 1):\n%s",
+                           df[(df["discount"] < 0) | (df["discount"] > 1)][["order_date", "pizza_name", "discount"]])
+
+    def train_model(self, train_size=0.8, size_preset="full", compact=False,
+                    evaluation="holdout", n_splits=5, n_jobs=None, params=None):
+        trained = self.model.train_model(self.df, train_size=train_size, size_preset=size_preset, compact=compact,
+                                         evaluation=evaluation, n_splits=n_splits, n_jobs=n_jobs, params=params)
+        if trained:
+            self._model_retrained()
+        return trained
+
+    def _model_retrained(self):
+        # A model fitted on all of self.df: later updates start at the current watermark and
+        # drift is measured against the new training sketch
+        self.model_watermark = self.watermark
+        self.drift_monitor = self.model.create_drift_monitor()
+
+    def update_model(self, n_new_trees=20, max_trees=None):
+        # Learns the rows that arrived (e.g. via refresh()) since the model was last trained or updated
+        if self.model_watermark is None:
+            logger.error("Train the model before updating it.")
+            return False
+        last_date, last_id = self.model_watermark
+        new_rows = self.df[(self.df["order_date"] > last_date) |
+                           ((self.df["order_date"] == last_date) & (self.df["order_id"] > last_id))]
+        updated = self.model.update_model(new_rows, n_new_trees=n_new_trees, max_trees=max_trees)
+        if updated:
+            self.model_watermark = self.watermark
+            # The learned rows are part of the training sketch now; drift is measured from here
+            self.drift_monitor = self.model.create_drift_monitor()
+        return updated
+
+    def check_drift(self):
+        # PSI/KS of the rows refreshed since the model was trained or updated, against its training data
+        if self.drift_monitor is None:
+            logger.info("No drift monitor; train the model first.")
+            return None
+        return self.drift_monitor.report()
+
+    def retrain_if_drifted(self, **train_kwargs):
+        report = self.check_drift()
+        if report is None or not report["retrain"]:
+            return False
+        logger.info(f"Retraining: drift in {report['drifted']} over {report['rows']} new rows.")
+        return self.train_model(**train_kwargs)
+
+    def get_ingredient_matrix(self):
+        # Ingredient lists are parsed once per menu, not per order line
+        if self.ingredient_matrix is None:
+            menu = self.pizza_dimension if self.pizza_dimension is not None else self.df
+            self.ingredient_matrix = IngredientMatrix.from_menu(menu[["pizza_name", "pizza_ingredients"]])
+        return self.ingredient_matrix
+
+    def get_ingredient_demand(self, from_date, to_date):
+        rows = self.df[(self.df["order_date"] >= pd.Timestamp(from_date)) &
+                       (self.df["order_date"] <= pd.Timestamp(to_date))]
+        return self.get_ingredient_matrix().historical_demand(rows)
+
+    def forecast_ingredient_demand(self, from_date, to_date, time_period="Evening", is_holiday=False, discount=0.0):
+        # Forecasts every product and size of the menu, then rolls them up in one sparse product
+        forecasts = []
+        for entry in self.model.product_catalog:
+            for date, quantity, *_ in self.model.predict_quantity(
+                    entry["pizza_name"], time_period, is_holiday, entry["pizza_category"], entry["pizza_size"],
+                    entry["unit_price"], discount, from_date, to_date):
+                forecasts.append((date, entry["pizza_name"], quantity))
+        forecasts = pd.DataFrame(forecasts, columns=["date", "product", "predicted_quantity"])
+        return self.get_ingredient_matrix().forecast_demand(forecasts)
+
+    def search_hyperparameters(self, param_space=None, n_iter=20, time_budget=None, n_jobs=None,
+                               leaderboard_path=None, refit=True):
+        version = self.model.model_version
+        leaderboard = self.model.search_hyperparameters(self.df, param_space=param_space, n_iter=n_iter,
+                                                        time_budget=time_budget, n_jobs=n_jobs,
+                                                        leaderboard_path=leaderboard_path, refit=refit)
+        if self.model.model_version != version:
+            self._model_retrained()
+        return leaderboard
+
+    def model_footprint(self):
+        return self.model.model_footprint()
+
+    def get_cache_stats(self):
+        return self.model.get_cache_stats()
+
+    def save_model(self, path, include_estimator=True):
+        return self.model.save_model(path, include_estimator=include_estimator)
+
+    def load_model(self, path):
+        return self.model.load_model(path)
+
+    def get_timings(self):
+        return telemetry.summary()
 
     def get_metrics(self):
         return self.model.get_metrics()
@@ -73,39 +310,128 @@ class Statistic(Connector):
     def get_feature_importances(self):
         return self.model.get_feature_importances()
 
-    def predict_quantity(self, product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount, from_date, to_date):
-        return self.model.predict_quantity(product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount, from_date, to_date)
+    def get_permutation_importances(self, n_repeats=5, n_jobs=None, progress=None):
+        return self.model.get_permutation_importances(n_repeats=n_repeats, n_jobs=n_jobs, progress=progress)
+
+    def optimize_price(self, product, time_period, is_holiday, pizza_category, pizza_size, from_date, to_date,
+                       prices=None, discounts=None, unit_cost=None, objective="revenue"):
+        return self.model.optimize_price(product, time_period, is_holiday, pizza_category, pizza_size, from_date,
+                                         to_date, prices=prices, discounts=discounts, unit_cost=unit_cost,
+                                         objective=objective)
+
+    def explain_prediction(self, product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount,
+                           from_date, to_date):
+        return self.model.explain_prediction(product, time_period, is_holiday, pizza_category, pizza_size, unit_price,
+                                             discount, from_date, to_date)
 
-    def get_data_in_range(self, product, from_date, to_date):
+    def predict_quantity(self, product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount, from_date, to_date,
+                         quantiles=None):
+        return self.model.predict_quantity(product, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount, from_date, to_date,
+                                           quantiles)
+
+    @staticmethod
+    def choose_resolution(from_date, to_date, max_points=MAX_CHART_POINTS):
+        days = (pd.Timestamp(to_date) - pd.Timestamp(from_date)).days + 1
+        for level, days_per_point in (("day", 1), ("week", 7), ("month", 30.44)):
+            if days / days_per_point <= max_points:
+                return level
+        return "quarter"
+
+    @telemetry.timed("statistic.get_data_in_range")
+    def get_data_in_range(self, product, from_date, to_date, resolution="day"):
+        if resolution == "auto":
+            resolution = self.choose_resolution(from_date, to_date)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}'; expected one of {RESOLUTIONS} or 'auto'.")
         try:
             if self.original_df is None or self.original_df.empty:
-                print("No data available in original DataFrame.")
+                logger.info("No data available in original DataFrame.")
                 return [], [], [], []
 
-            if not pd.api.types.is_datetime64_any_dtype(self.original_df["order_date"]):
-                self.original_df['order_date'] = pd.to_datetime(self.original_df['order_date'])
-
-            mask = (self.original_df["pizza_name"] == product) & (self.original_df["order_date"] >= from_date) & (self.original_df["order_date"] <= to_date)
-            filtered_df = self.original_df[mask].copy()
-
-            if filtered_df.empty:
-                print(f"No data found for product '{product}' between {from_date} and {to_date}.")
+            if product not in self.daily_totals.index.levels[0]:
+                logger.info(f"No data found for product '{product}' between {from_date} and {to_date}.")
                 return [], [], [], []
 
-            aggregated_df = filtered_df.groupby("order_date").agg({
-                "total_price": "sum",
-                "total_cost": "sum",
-                "quantity": "sum"
-            }).reset_index()
+            # Per-product totals are kept up to date by load() and refresh()
+            from_date, to_date = pd.Timestamp(from_date), pd.Timestamp(to_date)
+            if resolution == "day":
+                aggregated_df = self.daily_totals.loc[product].loc[from_date:to_date]
+            else:
+                aggregated_df = self._rollup_range(product, from_date, to_date, resolution)
+            aggregated_df = aggregated_df.reset_index()
 
-            aggregated_df.sort_values("order_date", inplace=True)
+            if aggregated_df.empty:
+                logger.info(f"No data found for product '{product}' between {from_date} and {to_date}.")
+                return [], [], [], []
 
-            dates = aggregated_df["order_date"].dt.strftime("%d/%m/%Y").tolist()
+            dates = self._format_buckets(aggregated_df["order_date"], resolution)
             revenues = aggregated_df["total_price"].tolist()
             costs = aggregated_df["total_cost"].tolist()
             quantities = aggregated_df["quantity"].tolist()
 
             return dates, revenues, costs, quantities
         except Exception as e:
-            print(f"Error in get_data_in_range: {e}")
-            return [], [], [], []
\ No newline at end of file
+            logger.error(f"Error in get_data_in_range: {e}")
+            return [], [], [], []
+
+    def _rollup_range(self, product, from_date, to_date, level):
+        # Whole periods come straight from the pyramid; the first and last period are
+        # re-summed from the daily totals when the range only covers part of them
+        freq = ROLLUP_FREQS[level]
+        first, last = from_date.to_period(freq), to_date.to_period(freq)
+        levels = self.rollups[level].loc[product]
+        buckets = levels.loc[first.start_time:last.start_time].copy()
+        days = self.daily_totals.loc[product]
+        for period in {first, last}:
+            period_start, period_end = period.start_time, period.end_time.normalize()
+            start, end = max(period_start, from_date), min(period_end, to_date)
+            if (start, end) == (period_start, period_end) or period_start not in buckets.index:
+                continue
+            partial = days.loc[start:end]
+            if partial.empty:
+                buckets = buckets.drop(period.start_time)
+            else:
+                buckets.loc[period.start_time] = partial.sum()
+        return buckets.astype(levels.dtypes.to_dict())
+
+    @staticmethod
+    def _format_buckets(starts, resolution):
+        if resolution == "month":
+            return starts.dt.strftime("%m/%Y").tolist()
+        if resolution == "quarter":
+            return [f"Q{quarter}/{year}" for quarter, year in zip(starts.dt.quarter, starts.dt.year)]
+        return starts.dt.strftime("%d/%m/%Y").tolist()
+
+    @telemetry.timed("statistic.get_top_products")
+    def get_top_products(self, from_date, to_date, metric="revenue", n=10, ascending=False):
+        # Per-product revenue, cost, margin and quantity over the range, best (or worst) n by metric
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'; expected one of {LEADERBOARD_METRICS}.")
+        empty = pd.DataFrame(columns=["product", *LEADERBOARD_METRICS])
+        try:
+            if self.daily_totals is None or n <= 0:
+                return empty
+            days = self.daily_totals.index.get_level_values("order_date")
+            in_range = (days >= pd.Timestamp(from_date)) & (days <= pd.Timestamp(to_date))
+            totals = self.daily_totals[in_range].groupby(level="pizza_name", observed=True).sum()
+            if totals.empty:
+                logger.info(f"No sales between {from_date} and {to_date}.")
+                return empty
+
+            revenue = totals["total_price"].to_numpy()
+            cost = totals["total_cost"].to_numpy()
+            board = pd.DataFrame({
+                "product": totals.index.astype(str),
+                "revenue": revenue,
+                "cost": cost,
+                "margin": revenue - cost,
+                "quantity": totals["quantity"].to_numpy(),
+            })
+            # Only the n winners get sorted; the rest of the menu is just partitioned away
+            keys = board[metric].to_numpy() if ascending else -board[metric].to_numpy()
+            top = np.argpartition(keys, n - 1)[:n] if n < len(board) else np.arange(len(board))
+            top = top[np.argsort(keys[top], kind="stable")]
+            return board.iloc[top].reset_index(drop=True)
+        except Exception as e:
+            logger.error(f"Error in get_top_products: {e}")
+            return empty
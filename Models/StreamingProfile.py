@@ -0,0 +1,285 @@
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from .Telemetry import get_logger, span
+
+logger = get_logger("profile")
+
+# The same summaries load_data used to log from the full DataFrame
+MOMENT_COLUMNS = ["quantity", "unit_price", "discount", "total_price", "total_cost"]
+COUNT_COLUMNS = ["pizza_name", "pizza_category", "pizza_size", "unit_price", "discount", "quantity",
+                 "is_holiday", "time_period"]
+GROUP_COLUMNS = ["pizza_name", "time_period", "is_holiday", "unit_price", "discount"]
+CORRELATION_COLUMNS = ["quantity", "pizza_category", "pizza_size", "unit_price", "discount", "total_cost",
+                       "is_holiday", "time_period"]
+# (column, description, test) for the anomaly checks of Statistic._check_invalid_values
+ANOMALY_CHECKS = [
+    ("total_cost", "negative total_cost", lambda values: values < 0),
+    ("unit_price", "negative unit_price", lambda values: values < 0),
+    ("quantity", "negative quantity", lambda values: values < 0),
+    ("discount", "discount outside [0, 1]", lambda values: (values < 0) | (values > 1)),
+]
+ANOMALY_EXAMPLES = 5
+TDIGEST_COMPRESSION = 200
+
+
+class Moments:
+    # Count, mean, sum of squared deviations, min and max per column. Chunks are combined
+    # with the parallel form of Welford's update, so any merge order gives the same result.
+    def __init__(self, n_columns):
+        self.n = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, X):
+        valid = ~np.isnan(X)
+        n = valid.sum(axis=0).astype(np.float64)
+        filled = np.where(valid, X, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, filled.sum(axis=0) / n, 0.0)
+        m2 = np.where(valid, (X - mean) ** 2, 0.0).sum(axis=0)
+        chunk = Moments(X.shape[1])
+        chunk.n, chunk.mean, chunk.m2 = n, mean, m2
+        chunk.min = np.where(valid, X, np.inf).min(axis=0)
+        chunk.max = np.where(valid, X, -np.inf).max(axis=0)
+        return self.merge(chunk)
+
+    def merge(self, other):
+        n = self.n + other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = other.mean - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * other.n / n, 0.0)
+            self.m2 = np.where(n > 0, self.m2 + other.m2 + delta ** 2 * self.n * other.n / n, 0.0)
+        self.n = n
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.where(self.n > 1, self.m2 / (self.n - 1), np.nan))
+
+
+class CoMoments:
+    # Mean vector and co-moment matrix sum((x - mean)(x - mean)^T) over complete rows
+    def __init__(self, n_columns):
+        self.n = 0
+        self.mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))
+
+    def update(self, X):
+        X = X[~np.isnan(X).any(axis=1)]
+        chunk = CoMoments(X.shape[1])
+        if len(X):
+            chunk.n = len(X)
+            chunk.mean = X.mean(axis=0)
+            centered = X - chunk.mean
+            chunk.comoment = centered.T @ centered
+        return self.merge(chunk)
+
+    def merge(self, other):
+        n = self.n + other.n
+        if other.n:
+            delta = other.mean - self.mean
+            self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.n * other.n / n
+            self.mean = self.mean + delta * other.n / n
+            self.n = n
+        return self
+
+    def correlation(self):
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.comoment / np.outer(scale, scale)
+
+
+class TDigest:
+    # Merging t-digest: weighted centroids whose size limit follows the k1 scale function,
+    # so the tails keep small clusters and quantiles there stay accurate
+    def __init__(self, compression=TDIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self._compress(values, np.ones(len(values)))
+        return self
+
+    def merge(self, other):
+        if len(other.weights):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(other.means, other.weights)
+        return self
+
+    def _compress(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        cluster = np.unique(cluster, return_inverse=True)[1].ravel()
+        self.weights = np.bincount(cluster, weights=weights)
+        self.means = np.bincount(cluster, weights=means * weights) / self.weights
+
+    def quantile(self, q):
+        if not len(self.weights):
+            return np.full(np.shape(q), np.nan)
+        positions = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return np.interp(q, np.concatenate([[0.0], positions, [1.0]]),
+                         np.concatenate([[self.min], self.means, [self.max]]))
+
+
+class StreamingProfile:
+    # One-pass, mergeable summary of pizza_data rows: build one per chunk (in any process),
+    # merge them, and memory stays bounded by the number of distinct values, not rows
+    def __init__(self):
+        self.rows = 0
+        self.moments = Moments(len(MOMENT_COLUMNS))
+        self.quantile_digests = {col: TDigest() for col in MOMENT_COLUMNS}
+        self.comoments = CoMoments(len(CORRELATION_COLUMNS))
+        self.counts = {col: pd.Series(dtype=np.int64) for col in COUNT_COLUMNS}
+        self.group_sums = {col: pd.DataFrame(columns=["sum", "count"], dtype=np.float64) for col in GROUP_COLUMNS}
+        self.anomalies = {description: 0 for _, description, _ in ANOMALY_CHECKS}
+        self.anomaly_examples = {description: [] for _, description, _ in ANOMALY_CHECKS}
+
+    @staticmethod
+    def _numeric(chunk, columns):
+        return np.column_stack([pd.to_numeric(np.asarray(chunk[col]), errors="coerce").astype(np.float64)
+                                for col in columns])
+
+    def update(self, chunk):
+        if chunk is None or not len(chunk):
+            return self
+        self.rows += len(chunk)
+        moment_values = self._numeric(chunk, MOMENT_COLUMNS)
+        self.moments.update(moment_values)
+        for j, col in enumerate(MOMENT_COLUMNS):
+            self.quantile_digests[col].update(moment_values[:, j])
+        self.comoments.update(self._numeric(chunk, CORRELATION_COLUMNS))
+
+        for col in COUNT_COLUMNS:
+            counts = chunk[col].astype(object).value_counts(dropna=False)
+            self.counts[col] = self.counts[col].add(counts, fill_value=0).astype(np.int64)
+        for col in GROUP_COLUMNS:
+            sums = chunk.groupby(chunk[col].astype(object), dropna=False)["quantity"].agg(["sum", "count"])
+            self.group_sums[col] = self.group_sums[col].add(sums, fill_value=0)
+
+        for col, description, test in ANOMALY_CHECKS:
+            flagged = test(pd.to_numeric(chunk[col], errors="coerce"))
+            if flagged.any():
+                self.anomalies[description] += int(flagged.sum())
+                examples = self.anomaly_examples[description]
+                needed = ANOMALY_EXAMPLES - len(examples)
+                if needed > 0:
+                    rows = chunk.loc[flagged, ["order_date", "pizza_name", col]].head(needed)
+                    examples.extend(rows.astype(object).to_dict("records"))
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.moments.merge(other.moments)
+        for col, digest in self.quantile_digests.items():
+            digest.merge(other.quantile_digests[col])
+        self.comoments.merge(other.comoments)
+        for col in COUNT_COLUMNS:
+            self.counts[col] = self.counts[col].add(other.counts[col], fill_value=0).astype(np.int64)
+        for col in GROUP_COLUMNS:
+            self.group_sums[col] = self.group_sums[col].add(other.group_sums[col], fill_value=0)
+        for description, count in other.anomalies.items():
+            self.anomalies[description] += count
+            examples = self.anomaly_examples[description]
+            examples.extend(other.anomaly_examples[description][:ANOMALY_EXAMPLES - len(examples)])
+        return self
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)):
+        frame = pd.DataFrame({"count": self.moments.n, "mean": self.moments.mean, "std": self.moments.std,
+                              "min": self.moments.min, "max": self.moments.max}, index=MOMENT_COLUMNS)
+        for q in quantiles:
+            frame[f"p{q * 100:g}"] = [float(self.quantile_digests[col].quantile(q)) for col in MOMENT_COLUMNS]
+        return frame
+
+    def value_counts(self, col):
+        return self.counts[col].sort_values(ascending=False)
+
+    def group_means(self, col):
+        sums = self.group_sums[col]
+        return (sums["sum"] / sums["count"]).rename("quantity").sort_index()
+
+    def correlations(self):
+        return pd.DataFrame(self.comoments.correlation(), index=CORRELATION_COLUMNS, columns=CORRELATION_COLUMNS)
+
+    def log(self, log=logger):
+        log.debug("Rows profiled: %d", self.rows)
+        for col in COUNT_COLUMNS:
+            log.debug("Unique values in %s: %s", col, self.counts[col].index.tolist())
+        log.debug("Distribution of quantity:\n%s", self.value_counts("quantity"))
+        for col in GROUP_COLUMNS:
+            log.debug("Average quantity by %s:\n%s", col, self.group_means(col))
+        log.debug("Correlation with quantity:\n%s", self.correlations()["quantity"])
+        log.debug("Summary:\n%s", self.summary())
+        for description, count in self.anomalies.items():
+            if count:
+                log.warning("%d rows with %s, e.g. %s", count, description, self.anomaly_examples[description])
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "summary": self.summary().to_dict("index"),
+            "value_counts": {col: {str(k): int(v) for k, v in self.value_counts(col).items()}
+                             for col in COUNT_COLUMNS},
+            "average_quantity_by": {col: {str(k): float(v) for k, v in self.group_means(col).items()}
+                                    for col in GROUP_COLUMNS},
+            "correlation_with_quantity": self.correlations()["quantity"].to_dict(),
+            "anomalies": self.anomalies,
+            "anomaly_examples": {k: [{c: str(v) for c, v in row.items()} for row in rows]
+                                 for k, rows in self.anomaly_examples.items()},
+        }
+
+
+def _profile_chunk(chunk):
+    return StreamingProfile().update(chunk)
+
+
+def profile_chunks(chunks, n_jobs=None, max_pending=None):
+    # Chunks are profiled in worker processes and merged as they finish. At most
+    # max_pending chunks are in flight, so memory does not grow with the table.
+    profile = StreamingProfile()
+    with span("profile.chunks"):
+        if n_jobs == 1:
+            for chunk in chunks:
+                profile.update(chunk)
+        else:
+            max_pending = max_pending or 2 * (n_jobs or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                pending = set()
+                for chunk in chunks:
+                    pending.add(executor.submit(_profile_chunk, chunk))
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            profile.merge(future.result())
+                for future in pending:
+                    profile.merge(future.result())
+    logger.info(f"Profiled {profile.rows} rows.")
+    return profile
+
+
+def csv_chunks(path, chunk_size=100_000):
+    yield from pd.read_csv(path, chunksize=chunk_size, parse_dates=["order_date"])
@@ -0,0 +1,99 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+LOGGER_NAME = "pizzamanager"
+
+
+def get_logger(name):
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure_logging(level=None):
+    # Level comes from the argument, then PIZZA_LOG_LEVEL, then INFO
+    level = level or os.environ.get("PIZZA_LOG_LEVEL", "INFO")
+    logging.basicConfig(format="%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+    logging.getLogger(LOGGER_NAME).setLevel(level.upper() if isinstance(level, str) else level)
+
+
+class SpanStats:
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+
+class Telemetry:
+    # Aggregates named timing spans for the whole session (process)
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+        self._logger = get_logger("telemetry")
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats()
+            stats.add(seconds)
+        self._logger.debug("%s took %.2f ms", name, seconds * 1000)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    "count": stats.count,
+                    "total_s": stats.total,
+                    "mean_ms": stats.total / stats.count * 1000,
+                    "min_ms": stats.min * 1000,
+                    "max_ms": stats.max * 1000,
+                }
+                for name, stats in sorted(self._spans.items())
+            }
+
+    def format_summary(self):
+        summary = self.summary()
+        if not summary:
+            return "No timings recorded."
+        lines = [f"{'span':<28}{'count':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}"]
+        for name, stats in sorted(summary.items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(f"{name:<28}{stats['count']:>8}{stats['total_s']:>10.3f}"
+                         f"{stats['mean_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+
+
+telemetry = Telemetry()
+span = telemetry.span
@@ -0,0 +1,44 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+_pending = set()
+
+
+class _Relay(QObject):
+    finished = pyqtSignal(object, object)
+
+
+def on_query_done(handle, callback):
+    # callback(result, error) runs on the GUI thread once the background query ends;
+    # the relay lives in the GUI thread, so the signal emitted by the worker is queued
+    relay = _Relay()
+    _pending.add(relay)
+
+    def deliver(result, error):
+        _pending.discard(relay)
+        callback(result, error)
+
+    def forward(done_handle):
+        try:
+            result, error = done_handle.result(), None
+        except BaseException as e:
+            result, error = None, e
+        relay.finished.emit(result, error)
+
+    relay.finished.connect(deliver)
+    handle.add_done_callback(forward)
+
+
+class _ProgressRelay(QObject):
+    progressed = pyqtSignal(int, int)
+
+
+def progress_callback(callback):
+    # Returns fn(done, total) that is safe to call from a worker thread;
+    # callback(done, total) then runs on the GUI thread
+    relay = _ProgressRelay()
+    relay.progressed.connect(callback)
+
+    def report(done, total):
+        relay.progressed.emit(done, total)
+
+    return report
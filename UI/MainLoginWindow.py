@@ -1,13 +1,25 @@
+from concurrent.futures import CancelledError, TimeoutError
+
 from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QKeySequence, QShortcut
 from PyQt6.QtWidgets import QMainWindow, QMessageBox, QLineEdit
 
 from Connectors.AdminConnector import AdminConnector
+from Connectors.AsyncQuery import AsyncQueryRunner
+from UI.AsyncBridge import on_query_done
 from UI.FINAL_LOGIN import Ui_MainWindow
 from UI.MainProgramWindowExt import MainProgramWindowExt
+from Models.Telemetry import get_logger
+
+logger = get_logger("ui.login")
+
+LOGIN_TIMEOUT = 15
 
 class LoginMainWindowExt(Ui_MainWindow):
     def __init__(self):
         self.adconnector = AdminConnector()
+        self.query_runner = AsyncQueryRunner(self.adconnector)
+        self.login_query = None
     def setupUi(self, MainWindow):
         super().setupUi(MainWindow)
         self.MainWindow = MainWindow
@@ -18,6 +30,9 @@ class LoginMainWindowExt(Ui_MainWindow):
     def SetupSignalAndSlot(self):
         self.pushButtonLogin.clicked.connect(self.solve_signIN)
         self.ckbShow.toggled.connect(self.toggle_password_visibility)
+        # Esc gives up on a sign in that is still waiting for the database
+        self.shortcutCancel = QShortcut(QKeySequence("Esc"), self.MainWindow)
+        self.shortcutCancel.activated.connect(self.cancel_sign_in)
 
     def toggle_password_visibility(self):
         if self.ckbShow.isChecked():
@@ -25,28 +40,51 @@ class LoginMainWindowExt(Ui_MainWindow):
         else:
             self.lineEditPassWord.setEchoMode(QLineEdit.EchoMode.Password)  #
     def solve_signIN(self):
-        try:
-            username = self.lineEditUserName.text().strip()
-            password = self.lineEditPassWord.text().strip()
+        username = self.lineEditUserName.text().strip()
+        password = self.lineEditPassWord.text().strip()
+
+        # The query runs on the connector's worker thread so a slow server cannot freeze the window
+        self.pushButtonLogin.setEnabled(False)
+        self.login_query = self.query_runner.submit(self.sign_in, username, password, timeout=LOGIN_TIMEOUT)
+        on_query_done(self.login_query, self.on_sign_in_done)
 
-            self.adconnector.connect()
-            self.adlogin = self.adconnector.sign_in(username, password)
+    def cancel_sign_in(self):
+        if self.login_query is not None and not self.login_query.done():
+            logger.info("Sign in cancelled")
+            self.login_query.cancel()
 
+    def sign_in(self, username, password):
+        self.adconnector.connect()
+        return self.adconnector.sign_in(username, password)
+
+    def on_sign_in_done(self, adlogin, error):
+        self.pushButtonLogin.setEnabled(True)
+        try:
+            if isinstance(error, CancelledError):
+                return
+            if isinstance(error, TimeoutError):
+                logger.error(f"Sign in timed out: {error}")
+                QMessageBox.critical(self.MainWindow, 'Login Fail',
+                                     'The database did not respond in time, please try again')
+                return
+            if error is not None:
+                raise error
+
+            self.adlogin = adlogin
             if self.adlogin != None:
             # if username == 'admin' and password == '123':
-                print("Successful Sign in")
+                logger.info("Successful Sign in")
                 self.MainWindow.hide()
                 self.mainwindow = QMainWindow()
                 self.myui = MainProgramWindowExt()
                 self.myui.setupUi(self.mainwindow)
                 self.myui.showWindow()
             else:
-                print(" Login Fail ")
+                logger.info("Login Fail")
                 self.msg = QMessageBox()
                 self.msg.setWindowTitle('Login Fail')
                 self.msg.setText('Incorrect UserName or Password, Please try again')
                 self.msg.setIcon(QMessageBox.Icon.Critical)
                 self.msg.exec()
         except Exception as e:
-            print(f" Occur Error: {e}")
-
+            logger.error(f"Occur Error: {e}")
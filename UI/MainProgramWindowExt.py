@@ -1,51 +1,42 @@
-from PyQt6 import QtWidgets
+from concurrent.futures import CancelledError
+
+from PyQt6 import QtCore, QtWidgets
+from PyQt6.QtGui import QKeySequence, QShortcut
+from UI.AsyncBridge import on_query_done, progress_callback
 from UI.FINAL_MAINWINDOW import Ui_MainWindow
-from Models.Statistic import Statistic
+from Connectors.AsyncQuery import AsyncQueryRunner
+from Models.PredictionModel import PRICE_GRID_RANGE
+from Models.Statistic import LEADERBOARD_METRICS, Statistic
+from Models.Telemetry import get_logger, span, telemetry
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+logger = get_logger("ui.main")
+
+STATISTICS_LOAD_TIMEOUT = 120
+# Spread of the per-tree predictions shown around each forecast
+PREDICTION_BAND = (0.1, 0.9)
+
 class MainProgramWindowExt(Ui_MainWindow):
     def setupUi(self, MainWindow):
         super().setupUi(MainWindow)
         self.MainWindow = MainWindow
 
-        # Initialize the Statistic model
-        self.statistic_model = Statistic()
-
-        # Populate comboboxes with values from data
-        if not self.statistic_model.df.empty:
-            # Populate product types
-            product_types = self.statistic_model.df["pizza_name"].unique().tolist()
-            self.cbolistTypeofProduct.addItems(product_types)
-
-            # Populate pizza categories (as strings)
-            pizza_categories = [str(cat) for cat in self.statistic_model.df["pizza_category"].unique()]
-            self.cboIsHoliday_2.clear()
-            self.cboIsHoliday_2.addItems(pizza_categories)
-
-            # Populate pizza sizes (as strings)
-            pizza_sizes = [str(size) for size in self.statistic_model.df["pizza_size"].unique()]
-            self.cboIsHoliday_3.clear()
-            self.cboIsHoliday_3.addItems(pizza_sizes)
-
-            # Populate time periods
-            time_periods = self.statistic_model.df["time_period"].unique().tolist()
-            time_period_mapping = {1: 'Morning', 2: 'Afternoon', 4: 'Evening'}
-            time_periods = [time_period_mapping.get(tp, str(tp)) for tp in time_periods]
-            self.cboPeriod.addItems(time_periods)
+        # Initialize the Statistic model; pizza_data is loaded on a background thread
+        self.statistic_model = Statistic(autoload=False)
+        self.query_runner = AsyncQueryRunner(self.statistic_model)
+        # Model work (permutation importance) gets its own worker so it never queues behind queries
+        self.model_runner = AsyncQueryRunner(self.statistic_model)
+        self.importance_job = None
 
-            # Populate is_holiday
-            self.cboIsHoliday.addItems(["Yes", "No"])
-        else:
-            print("No data available to populate comboboxes.")
-
-        # Set up the tableWidgetStatistic_Predict with 9 columns to include Total Cost
-        self.tableWidgetStatistic_Predict.setColumnCount(9)
+        # Set up the tableWidgetStatistic_Predict with 11 columns to include Total Cost and the P10/P90 band
+        self.tableWidgetStatistic_Predict.setColumnCount(11)
         self.tableWidgetStatistic_Predict.setHorizontalHeaderLabels([
             "Product Type", "Pizza Category", "Pizza Size", "Unit Price", "Date",
-            "Time Period", "Is Holiday", "Predicted Quantity", "Total Cost"
+            "Time Period", "Is Holiday", "Predicted Quantity", "Total Cost", "P10", "P90"
         ])
 
         # Initialize plots for Revenue/Cost and Quantity (Statistic tab)
@@ -62,6 +53,9 @@ class MainProgramWindowExt(Ui_MainWindow):
         self.canvas_prediction = FigureCanvas(self.figure_prediction)
         self.verticalLayoutPlot_6.addWidget(self.canvas_prediction)
 
+        # Top-N products over a date range (Leaderboard tab)
+        self.setup_leaderboard_tab()
+
         # Connect the Execute button (Statistic tab)
         self.pushButtonExecute.clicked.connect(self.update_statistic_tab)
 
@@ -74,6 +68,171 @@ class MainProgramWindowExt(Ui_MainWindow):
         # Connect the Evaluate button (Prediction tab)
         self.pushButtonPredict_3.clicked.connect(self.evaluate_model)
 
+        # Optimize button (Prediction tab): best unit price / discount for the selected product
+        self.pushButtonOptimize = QtWidgets.QPushButton("Optimize", parent=self.groupBox_8)
+        self.pushButtonOptimize.setGeometry(QtCore.QRect(310, 200, 121, 31))
+        self.pushButtonOptimize.setFont(self.pushButtonPredict.font())
+        self.pushButtonOptimize.setStyleSheet("background-color: rgb(244, 255, 254);")
+        self.pushButtonOptimize.clicked.connect(self.optimize_price)
+
+        # Double-clicking a forecast row shows which inputs drove it
+        self.prediction_explanation = None
+        self.tableWidgetStatistic_Predict.cellDoubleClicked.connect(self.show_prediction_breakdown)
+
+        # Ctrl+T shows where the session's time went
+        self.shortcutTimings = QShortcut(QKeySequence("Ctrl+T"), MainWindow)
+        self.shortcutTimings.activated.connect(self.show_timings)
+
+        # Esc abandons a data load that is still running
+        self.shortcutCancel = QShortcut(QKeySequence("Esc"), MainWindow)
+        self.shortcutCancel.activated.connect(self.cancel_loading)
+
+        # F5 pulls orders added since the data was loaded
+        self.shortcutRefresh = QShortcut(QKeySequence("F5"), MainWindow)
+        self.shortcutRefresh.activated.connect(self.refresh_data)
+
+        # Data actions stay disabled until the background load has finished
+        self.set_data_actions_enabled(False)
+        self.load_query = self.query_runner.submit(self.statistic_model.load, timeout=STATISTICS_LOAD_TIMEOUT)
+        on_query_done(self.load_query, self.on_statistics_loaded)
+
+    def cancel_loading(self):
+        if not self.load_query.done():
+            logger.info("Cancelling statistics load")
+            self.load_query.cancel()
+
+    def refresh_data(self):
+        if not self.load_query.done():
+            return
+        # The refresh replaces the frames and totals the data actions read
+        self.set_data_actions_enabled(False)
+        self.load_query = self.query_runner.submit(self.statistic_model.refresh, timeout=STATISTICS_LOAD_TIMEOUT)
+        on_query_done(self.load_query, self.on_statistics_refreshed)
+
+    def on_statistics_refreshed(self, new_rows, error):
+        self.set_data_actions_enabled(self.statistic_model.df is not None)
+        if error is not None:
+            logger.error(f"Failed to refresh statistics data: {error!r}")
+            return
+        self.statusbar.showMessage(f"{new_rows} new records loaded", 5000)
+
+    def on_statistics_loaded(self, statistic, error):
+        if isinstance(error, CancelledError):
+            logger.info("Statistics load cancelled")
+            return
+        if error is not None:
+            logger.error(f"Failed to load statistics data: {error!r}")
+            QtWidgets.QMessageBox.critical(self.MainWindow, "Error", f"Failed to load sales data: {error}")
+            return
+        self.populate_inputs()
+        self.set_data_actions_enabled(True)
+
+    def set_data_actions_enabled(self, enabled):
+        for button in (self.pushButtonExecute, self.pushButtonPredict, self.pushButtonPredict_3,
+                       self.pushButtonRank, self.pushButtonOptimize):
+            button.setEnabled(enabled)
+        # Training replaces the forest and feature matrix a running permutation importance job reads
+        importance_running = self.importance_job is not None and not self.importance_job.done()
+        self.pushButtonPredict_4.setEnabled(enabled and not importance_running)
+
+    def populate_inputs(self):
+        # Populate comboboxes with values from data
+        if not self.statistic_model.df.empty:
+            # Populate product types
+            product_types = self.statistic_model.df["pizza_name"].unique().tolist()
+            self.cbolistTypeofProduct.addItems(product_types)
+
+            # Populate pizza categories (as strings)
+            pizza_categories = [str(cat) for cat in self.statistic_model.df["pizza_category"].unique()]
+            self.cboIsHoliday_2.clear()
+            self.cboIsHoliday_2.addItems(pizza_categories)
+
+            # Populate pizza sizes (as strings)
+            pizza_sizes = [str(size) for size in self.statistic_model.df["pizza_size"].unique()]
+            self.cboIsHoliday_3.clear()
+            self.cboIsHoliday_3.addItems(pizza_sizes)
+
+            # Populate time periods
+            time_periods = self.statistic_model.df["time_period"].unique().tolist()
+            time_period_mapping = {1: 'Morning', 2: 'Afternoon', 4: 'Evening'}
+            time_periods = [time_period_mapping.get(tp, str(tp)) for tp in time_periods]
+            self.cboPeriod.addItems(time_periods)
+
+            # Populate is_holiday
+            self.cboIsHoliday.addItems(["Yes", "No"])
+
+            # Leaderboard defaults to the whole loaded period
+            first_day, last_day = self.statistic_model.df["order_date"].agg(["min", "max"])
+            self.dateEditRankFrom.setDate(QtCore.QDate(first_day.year, first_day.month, first_day.day))
+            self.dateEditRankTo.setDate(QtCore.QDate(last_day.year, last_day.month, last_day.day))
+        else:
+            logger.warning("No data available to populate comboboxes.")
+
+    def setup_leaderboard_tab(self):
+        self.tabLeaderboard = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(self.tabLeaderboard)
+        controls = QtWidgets.QHBoxLayout()
+
+        self.dateEditRankFrom = QtWidgets.QDateEdit(calendarPopup=True)
+        self.dateEditRankTo = QtWidgets.QDateEdit(calendarPopup=True)
+        for date_edit in (self.dateEditRankFrom, self.dateEditRankTo):
+            date_edit.setDisplayFormat("dd/MM/yyyy")
+        self.cboRankMetric = QtWidgets.QComboBox()
+        self.cboRankMetric.addItems([metric.capitalize() for metric in LEADERBOARD_METRICS])
+        self.spinBoxTopN = QtWidgets.QSpinBox()
+        self.spinBoxTopN.setRange(1, 100)
+        self.spinBoxTopN.setValue(10)
+        self.checkBoxRankLowest = QtWidgets.QCheckBox("Lowest first")
+        self.pushButtonRank = QtWidgets.QPushButton("Rank")
+        self.pushButtonRank.setStyleSheet("background-color: rgb(243, 255, 254);")
+        self.pushButtonRank.clicked.connect(self.update_leaderboard_tab)
+
+        for label, widget in (("From", self.dateEditRankFrom), ("To", self.dateEditRankTo),
+                              ("Rank by", self.cboRankMetric), ("Top", self.spinBoxTopN)):
+            controls.addWidget(QtWidgets.QLabel(label))
+            controls.addWidget(widget)
+        controls.addWidget(self.checkBoxRankLowest)
+        controls.addWidget(self.pushButtonRank)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.tableWidgetLeaderboard = QtWidgets.QTableWidget(0, 6)
+        self.tableWidgetLeaderboard.setStyleSheet("background-color: rgb(255, 255, 255);")
+        self.tableWidgetLeaderboard.setHorizontalHeaderLabels(
+            ["Rank", "Product", "Revenue", "Cost", "Margin", "Quantity"])
+        self.tableWidgetLeaderboard.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.tableWidgetLeaderboard)
+        self.tabWidget.addTab(self.tabLeaderboard, "Leaderboard")
+
+    def update_leaderboard_tab(self):
+        from_date = pd.Timestamp(self.dateEditRankFrom.date().toPyDate())
+        to_date = pd.Timestamp(self.dateEditRankTo.date().toPyDate())
+        if from_date > to_date:
+            QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Date Range",
+                                          "The 'From' date must be before the 'To' date.")
+            return
+
+        metric = LEADERBOARD_METRICS[self.cboRankMetric.currentIndex()]
+        board = self.statistic_model.get_top_products(from_date, to_date, metric, self.spinBoxTopN.value(),
+                                                      ascending=self.checkBoxRankLowest.isChecked())
+        if board.empty:
+            QtWidgets.QMessageBox.information(self.MainWindow, "No Data", "No sales in the selected date range.")
+
+        self.tableWidgetLeaderboard.setRowCount(len(board))
+        for row, record in enumerate(board.itertuples(index=False)):
+            values = [str(row + 1), record.product, f"{record.revenue:,.2f}", f"{record.cost:,.2f}",
+                      f"{record.margin:,.2f}", str(record.quantity)]
+            for column, value in enumerate(values):
+                self.tableWidgetLeaderboard.setItem(row, column, QtWidgets.QTableWidgetItem(value))
+
+    def show_timings(self):
+        summary = telemetry.format_summary()
+        logger.info("Session timings:\n%s", summary)
+        box = QtWidgets.QMessageBox(self.MainWindow)
+        box.setWindowTitle("Session Timings")
+        box.setText(f"<pre>{summary}</pre>")
+        box.exec()
+
     def train_model(self):
         try:
             # Get train and test sizes from UI
@@ -113,18 +272,42 @@ class MainProgramWindowExt(Ui_MainWindow):
             self.lineEdit_11.setText(str(round(metrics["RMSE"], 4)))  # RMSE
             self.lineEdit_12.setText(str(round(metrics["R2"], 4)))  # R2 Score
 
-            # Display feature importances in a message box
-            feature_importances = self.statistic_model.get_feature_importances()
-            if feature_importances:
-                importance_text = "Feature Importances:\n"
-                for feature, importance in feature_importances.items():
-                    importance_text += f"{feature}: {importance:.4f}\n"
-                QtWidgets.QMessageBox.information(self.MainWindow, "Feature Importances", importance_text)
+            # Feature importances are shown once permutation importance finishes in the background
+            if self.importance_job is None or self.importance_job.done():
+                self.statusbar.showMessage("Computing permutation importance...")
+                self.importance_job = self.model_runner.submit(
+                    self.statistic_model.get_permutation_importances,
+                    progress=progress_callback(self.on_importance_progress))
+                self.pushButtonPredict_4.setEnabled(False)
+                on_query_done(self.importance_job, self.on_permutation_importances)
 
             QtWidgets.QMessageBox.information(self.MainWindow, "Success", "Model evaluation metrics updated.")
         except Exception as e:
             QtWidgets.QMessageBox.critical(self.MainWindow, "Error", f"Failed to evaluate model: {str(e)}")
 
+    def on_importance_progress(self, done, total):
+        self.statusbar.showMessage(f"Permutation importance: {done}/{total}")
+
+    def on_permutation_importances(self, permutation_importances, error):
+        self.statusbar.clearMessage()
+        self.pushButtonPredict_4.setEnabled(self.statistic_model.df is not None and self.load_query.done())
+        if error is not None:
+            logger.error(f"Failed to compute permutation importance: {error!r}")
+        feature_importances = self.statistic_model.get_feature_importances()
+        if not feature_importances:
+            return
+
+        # Impurity importances favour features with many distinct values (day, pizza_name);
+        # the MAE increase when a feature is shuffled does not
+        importance_text = "Feature Importances (impurity | permutation: MAE increase):\n"
+        for feature, importance in feature_importances.items():
+            importance_text += f"{feature}: {importance:.4f}"
+            if permutation_importances and feature in permutation_importances:
+                permuted = permutation_importances[feature]
+                importance_text += f" | {permuted['mean']:.4f} ± {permuted['std']:.4f}"
+            importance_text += "\n"
+        QtWidgets.QMessageBox.information(self.MainWindow, "Feature Importances", importance_text)
+
     def update_statistic_tab(self):
         # Get inputs from the UI
         pizza_name = self.listProduct.currentText()
@@ -148,8 +331,10 @@ class MainProgramWindowExt(Ui_MainWindow):
                                           "The 'From' date must be before the 'To' date.")
             return
 
-        # Get data in range
-        dates, revenues, costs, quantities = self.statistic_model.get_data_in_range(pizza_name, from_date, to_date)
+        # Long ranges are shown per week/month/quarter so the charts stay readable
+        resolution = self.statistic_model.choose_resolution(from_date, to_date)
+        dates, revenues, costs, quantities = self.statistic_model.get_data_in_range(pizza_name, from_date, to_date,
+                                                                                    resolution)
 
         if not dates:
             QtWidgets.QMessageBox.information(self.MainWindow, "No Data",
@@ -162,6 +347,11 @@ class MainProgramWindowExt(Ui_MainWindow):
             self.canvas_quantity.draw()
             return
 
+        with span("ui.render.statistic"):
+            self.render_statistic(pizza_name, dates, revenues, costs, quantities, resolution)
+
+    def render_statistic(self, pizza_name, dates, revenues, costs, quantities, resolution="day"):
+        x_label = "Date" if resolution == "day" else resolution.capitalize()
         # Update the table
         self.tableWidgetStatistic.setRowCount(len(dates))
         for row, (date, revenue, cost, quantity) in enumerate(zip(dates, revenues, costs, quantities)):
@@ -177,7 +367,7 @@ class MainProgramWindowExt(Ui_MainWindow):
         ax1.plot(dates, revenues, label="Revenue", color="green")
         ax1.plot(dates, costs, label="Cost", color="red")
         ax1.set_title(f"Revenue and Cost of {pizza_name}")
-        ax1.set_xlabel("Date")
+        ax1.set_xlabel(x_label)
         ax1.set_ylabel("Amount")
         ax1.legend()
         ax1.grid(True)
@@ -189,57 +379,68 @@ class MainProgramWindowExt(Ui_MainWindow):
         ax2 = self.figure_quantity.add_subplot(111)
         ax2.plot(dates, quantities, marker='o', color="blue")
         ax2.set_title(f"Quantity of {pizza_name} Over Time")
-        ax2.set_xlabel("Date")
+        ax2.set_xlabel(x_label)
         ax2.set_ylabel("Quantity")
         ax2.grid(True)
         self.figure_quantity.autofmt_xdate()
         self.canvas_quantity.draw()
 
-    def update_prediction_tab(self):
+    def read_prediction_inputs(self):
+        # Inputs of the Prediction tab, or None after warning about an invalid value
+        pizza_name = self.cbolistTypeofProduct.currentText()
+        time_period = self.cboPeriod.currentText()
+        is_holiday = self.cboIsHoliday.currentText() == "Yes"
+        pizza_category = self.cboIsHoliday_2.currentText()  # Should be renamed to cboPizzaCategory in UI
+        pizza_size = self.cboIsHoliday_3.currentText()  # Should be renamed to cboPizzaSize in UI
+        unit_price = self.lineEdit.text()
+        discount = self.lineEdit_2.text()
+        from_day = self.spinBoxFromDay.value()
+        from_month = self.spinBoxFromMonth.value()
+        to_day = self.spinBoxToDay.value()
+        to_month = self.spinBoxToMonth.value()
+
+        # Validate unit_price and discount
         try:
-            # Get inputs from the UI
-            pizza_name = self.cbolistTypeofProduct.currentText()
-            time_period = self.cboPeriod.currentText()
-            is_holiday = self.cboIsHoliday.currentText() == "Yes"
-            pizza_category = self.cboIsHoliday_2.currentText()  # Should be renamed to cboPizzaCategory in UI
-            pizza_size = self.cboIsHoliday_3.currentText()  # Should be renamed to cboPizzaSize in UI
-            unit_price = self.lineEdit.text()
-            discount = self.lineEdit_2.text()
-            from_day = self.spinBoxFromDay.value()
-            from_month = self.spinBoxFromMonth.value()
-            to_day = self.spinBoxToDay.value()
-            to_month = self.spinBoxToMonth.value()
-
-            # Validate unit_price and discount
-            try:
-                unit_price = float(unit_price) if unit_price else 0.0
-            except ValueError:
-                QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Input", "Unit Price must be a number.")
-                return
+            unit_price = float(unit_price) if unit_price else 0.0
+        except ValueError:
+            QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Input", "Unit Price must be a number.")
+            return None
 
-            try:
-                discount = float(discount) if discount else 0.0
-            except ValueError:
-                QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Input", "Discount must be a number.")
-                return
+        try:
+            discount = float(discount) if discount else 0.0
+        except ValueError:
+            QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Input", "Discount must be a number.")
+            return None
 
-            # Define the date range (year 2016 as in UI)
-            try:
-                from_date = pd.to_datetime(f"2016-{from_month}-{from_day}")
-                to_date = pd.to_datetime(f"2016-{to_month}-{to_day}")
-            except ValueError as e:
-                QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Date", "Please enter a valid date range.")
-                return
+        # Define the date range (year 2016 as in UI)
+        try:
+            from_date = pd.to_datetime(f"2016-{from_month}-{from_day}")
+            to_date = pd.to_datetime(f"2016-{to_month}-{to_day}")
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Date", "Please enter a valid date range.")
+            return None
+
+        # Ensure from_date is before to_date
+        if from_date > to_date:
+            QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Date Range",
+                                          "The 'From' date must be before the 'To' date.")
+            return None
+
+        return (pizza_name, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount,
+                from_date, to_date)
 
-            # Ensure from_date is before to_date
-            if from_date > to_date:
-                QtWidgets.QMessageBox.warning(self.MainWindow, "Invalid Date Range",
-                                              "The 'From' date must be before the 'To' date.")
+    def update_prediction_tab(self):
+        try:
+            inputs = self.read_prediction_inputs()
+            if inputs is None:
                 return
+            (pizza_name, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount,
+             from_date, to_date) = inputs
 
             # Predict quantities
             predictions = self.statistic_model.predict_quantity(
-                pizza_name, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount, from_date, to_date
+                pizza_name, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount, from_date, to_date,
+                quantiles=PREDICTION_BAND
             )
 
             # Check if predictions are empty
@@ -251,48 +452,121 @@ class MainProgramWindowExt(Ui_MainWindow):
                 self.canvas_prediction.draw()
                 return
 
-            # Update the table with floating-point quantities
-            self.tableWidgetStatistic_Predict.setRowCount(len(predictions))
-            for row, (date, quantity, pred_pizza_category, pred_pizza_size, pred_unit_price, pred_discount,
-                      pred_total_cost) in enumerate(predictions):
-                self.tableWidgetStatistic_Predict.setItem(row, 0, QtWidgets.QTableWidgetItem(pizza_name))
-                self.tableWidgetStatistic_Predict.setItem(row, 1, QtWidgets.QTableWidgetItem(str(pred_pizza_category)))
-                self.tableWidgetStatistic_Predict.setItem(row, 2, QtWidgets.QTableWidgetItem(str(pred_pizza_size)))
-                self.tableWidgetStatistic_Predict.setItem(row, 3, QtWidgets.QTableWidgetItem(f"{pred_unit_price:.2f}"))
-                self.tableWidgetStatistic_Predict.setItem(row, 4, QtWidgets.QTableWidgetItem(date.strftime("%Y-%m-%d")))
-                self.tableWidgetStatistic_Predict.setItem(row, 5, QtWidgets.QTableWidgetItem(time_period))
-                self.tableWidgetStatistic_Predict.setItem(row, 6,
-                                                          QtWidgets.QTableWidgetItem("Yes" if is_holiday else "No"))
-                self.tableWidgetStatistic_Predict.setItem(row, 7, QtWidgets.QTableWidgetItem(f"{quantity:.2f}"))
-                self.tableWidgetStatistic_Predict.setItem(row, 8,
-                                                          QtWidgets.QTableWidgetItem(f"{pred_total_cost:.2f}"))
-
-            # Sum daily predictions by month for the plot
-            pred_df = pd.DataFrame(predictions, columns=['date', 'quantity', 'category', 'size', 'unit_price', 'discount', 'total_cost'])
-            pred_df['date'] = pd.to_datetime(pred_df['date'])
-            pred_df['month'] = pred_df['date'].dt.month
-            monthly_totals = pred_df.groupby('month')['quantity'].sum().reindex(range(1, 13), fill_value=0)
-
-            # Update the plot as a line chart with monthly totals
-            self.figure_prediction.clear()
-            ax = self.figure_prediction.add_subplot(111)
-            ax.plot(range(1, 13), monthly_totals, marker='o', color='blue', label='Total Predicted Quantity')
-            ax.set_title(f"Total Predicted Sales Quantity per Month for {pizza_name} ({time_period})")
-            ax.set_xlabel("Month")
-            ax.set_ylabel("Total Quantity")
-            ax.grid(True)
-            ax.set_xticks(range(1, 13))
-            ax.set_xticklabels([f"Tháng {m}" for m in range(1, 13)])
-            ax.legend()
-            self.figure_prediction.tight_layout()
-            self.canvas_prediction.draw()
+            # Contributions for the whole range come from one call; rows look them up on double-click
+            self.prediction_explanation = self.statistic_model.explain_prediction(
+                pizza_name, time_period, is_holiday, pizza_category, pizza_size, unit_price, discount, from_date, to_date
+            )
+
+            with span("ui.render.prediction"):
+                self.render_prediction(predictions, pizza_name, time_period, is_holiday)
 
         except Exception as e:
-            print(f"Error in update_prediction_tab: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error in update_prediction_tab: {e}")
             QtWidgets.QMessageBox.critical(self.MainWindow, "Error",
                                            f"An error occurred while predicting: {str(e)}")
 
+    def optimize_price(self):
+        try:
+            inputs = self.read_prediction_inputs()
+            if inputs is None:
+                return
+            (pizza_name, time_period, is_holiday, pizza_category, pizza_size, unit_price, _,
+             from_date, to_date) = inputs
+
+            # Sweep around the typed price, or the menu price when none is given
+            prices = unit_price * np.linspace(*PRICE_GRID_RANGE, 41) if unit_price > 0 else None
+            result = self.statistic_model.optimize_price(pizza_name, time_period, is_holiday, pizza_category,
+                                                         pizza_size, from_date, to_date, prices=prices)
+            if result is None:
+                QtWidgets.QMessageBox.information(self.MainWindow, "No Optimum",
+                                                  "Could not evaluate prices for the given inputs.")
+                return
+            best, surface = result
+
+            with span("ui.render.optimizer"):
+                self.render_price_surface(surface, pizza_name, best)
+            QtWidgets.QMessageBox.information(
+                self.MainWindow, "Best Price",
+                f"{pizza_name} ({pizza_size}), {from_date.date()} - {to_date.date()}\n"
+                f"Unit price: {best['unit_price']:.2f}, discount: {best['discount']:.2f}\n"
+                f"Expected quantity: {best['quantity']:.1f}\n"
+                f"Expected revenue: {best['revenue']:.2f}\n"
+                f"Expected margin: {best['margin']:.2f}")
+        except Exception as e:
+            logger.exception(f"Error in optimize_price: {e}")
+            QtWidgets.QMessageBox.critical(self.MainWindow, "Error",
+                                           f"An error occurred while optimizing prices: {str(e)}")
+
+    def render_price_surface(self, surface, pizza_name, best):
+        revenue = surface.pivot(index="discount", columns="unit_price", values="revenue")
+        self.figure_prediction.clear()
+        ax = self.figure_prediction.add_subplot(111)
+        image = ax.pcolormesh(revenue.columns, revenue.index, revenue.to_numpy(), shading="nearest",
+                              cmap="viridis")
+        self.figure_prediction.colorbar(image, ax=ax, label="Expected Revenue")
+        ax.plot(best["unit_price"], best["discount"], marker="*", markersize=14, color="red", label="Best")
+        ax.set_title(f"Expected Revenue by Price and Discount for {pizza_name}")
+        ax.set_xlabel("Unit Price")
+        ax.set_ylabel("Discount")
+        ax.legend()
+        self.figure_prediction.tight_layout()
+        self.canvas_prediction.draw()
+
+    def show_prediction_breakdown(self, row, column):
+        if self.prediction_explanation is None or row >= len(self.prediction_explanation):
+            return
+        breakdown = self.prediction_explanation.iloc[row]
+        contributions = breakdown.drop(["bias", "prediction"])
+        contributions = contributions[contributions.abs().sort_values(ascending=False).index]
+        text = f"Baseline (average of training data): {breakdown['bias']:.4f}\n"
+        for feature, contribution in contributions.items():
+            text += f"{feature}: {contribution:+.4f}\n"
+        text += f"Prediction: {breakdown['prediction']:.4f}"
+        QtWidgets.QMessageBox.information(self.MainWindow,
+                                          f"Forecast breakdown for {breakdown.name.strftime('%Y-%m-%d')}", text)
+
+    def render_prediction(self, predictions, pizza_name, time_period, is_holiday):
+        # Update the table with floating-point quantities
+        self.tableWidgetStatistic_Predict.setRowCount(len(predictions))
+        for row, (date, quantity, pred_pizza_category, pred_pizza_size, pred_unit_price, pred_discount,
+                  pred_total_cost, low, high) in enumerate(predictions):
+            self.tableWidgetStatistic_Predict.setItem(row, 0, QtWidgets.QTableWidgetItem(pizza_name))
+            self.tableWidgetStatistic_Predict.setItem(row, 1, QtWidgets.QTableWidgetItem(str(pred_pizza_category)))
+            self.tableWidgetStatistic_Predict.setItem(row, 2, QtWidgets.QTableWidgetItem(str(pred_pizza_size)))
+            self.tableWidgetStatistic_Predict.setItem(row, 3, QtWidgets.QTableWidgetItem(f"{pred_unit_price:.2f}"))
+            self.tableWidgetStatistic_Predict.setItem(row, 4, QtWidgets.QTableWidgetItem(date.strftime("%Y-%m-%d")))
+            self.tableWidgetStatistic_Predict.setItem(row, 5, QtWidgets.QTableWidgetItem(time_period))
+            self.tableWidgetStatistic_Predict.setItem(row, 6,
+                                                      QtWidgets.QTableWidgetItem("Yes" if is_holiday else "No"))
+            self.tableWidgetStatistic_Predict.setItem(row, 7, QtWidgets.QTableWidgetItem(f"{quantity:.2f}"))
+            self.tableWidgetStatistic_Predict.setItem(row, 8,
+                                                      QtWidgets.QTableWidgetItem(f"{pred_total_cost:.2f}"))
+            self.tableWidgetStatistic_Predict.setItem(row, 9, QtWidgets.QTableWidgetItem(f"{low:.2f}"))
+            self.tableWidgetStatistic_Predict.setItem(row, 10, QtWidgets.QTableWidgetItem(f"{high:.2f}"))
+
+        # Sum daily predictions by month for the plot
+        pred_df = pd.DataFrame(predictions, columns=['date', 'quantity', 'category', 'size', 'unit_price', 'discount',
+                                                     'total_cost', 'low', 'high'])
+        pred_df['date'] = pd.to_datetime(pred_df['date'])
+        pred_df['month'] = pred_df['date'].dt.month
+        monthly = pred_df.groupby('month')[['quantity', 'low', 'high']].sum().reindex(range(1, 13), fill_value=0)
+
+        # Update the plot as a line chart with monthly totals; the band sums the daily
+        # P10/P90 values, so it is a slightly wider envelope than a monthly quantile
+        self.figure_prediction.clear()
+        ax = self.figure_prediction.add_subplot(111)
+        ax.fill_between(range(1, 13), monthly['low'], monthly['high'], color='blue', alpha=0.15,
+                        label=f'P{PREDICTION_BAND[0] * 100:.0f}–P{PREDICTION_BAND[1] * 100:.0f} band')
+        ax.plot(range(1, 13), monthly['quantity'], marker='o', color='blue', label='Total Predicted Quantity')
+        ax.set_title(f"Total Predicted Sales Quantity per Month for {pizza_name} ({time_period})")
+        ax.set_xlabel("Month")
+        ax.set_ylabel("Total Quantity")
+        ax.grid(True)
+        ax.set_xticks(range(1, 13))
+        ax.set_xticklabels([f"Tháng {m}" for m in range(1, 13)])
+        ax.legend()
+        self.figure_prediction.tight_layout()
+        self.canvas_prediction.draw()
+
     def showWindow(self):
         self.MainWindow.show()
\ No newline at end of file
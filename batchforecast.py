@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from Models.IngredientDemand import IngredientMatrix
+from Models.PredictionModel import PredictionModel
+from Models.Telemetry import configure_logging, get_logger, span, telemetry
+
+logger = get_logger("batchforecast")
+
+# Batch forecasting without the Qt UI, e.g.:
+#   python batchforecast.py --data-csv ./Data/Pizza_Cleaned.csv --save-model model.joblib \
+#       --from 2016-01-01 --to 2016-12-31 --output forecasts.csv
+#   python batchforecast.py --model model.joblib --spec nightly.json --output forecasts.parquet --workers 8
+
+DEFAULT_SCENARIO = {"name": "base", "time_period": "Evening", "is_holiday": False, "discount": 0.0}
+
+_worker_model = None
+
+
+def _init_worker(model_path, model=None):
+    global _worker_model
+    if model is None:
+        model = PredictionModel()
+        if not model.load_model(model_path):
+            raise RuntimeError(f"Worker could not load model from {model_path}")
+    _worker_model = model
+
+
+def _forecast_product(product, entries, scenarios, from_date, to_date):
+    rows = []
+    for entry in entries:
+        for scenario in scenarios:
+            unit_price = scenario.get("unit_price", entry["unit_price"])
+            discount = scenario.get("discount", 0.0)
+            time_period = scenario.get("time_period", DEFAULT_SCENARIO["time_period"])
+            is_holiday = bool(scenario.get("is_holiday", False))
+            predictions = _worker_model.predict_quantity(
+                product, time_period, is_holiday, entry["pizza_category"], entry["pizza_size"],
+                unit_price, discount, from_date, to_date
+            )
+            for date, quantity, category, size, price, disc, total_cost in predictions:
+                rows.append({
+                    "date": date.strftime("%Y-%m-%d"),
+                    "product": product,
+                    "pizza_size": size,
+                    "pizza_category": category,
+                    "scenario": scenario.get("name", DEFAULT_SCENARIO["name"]),
+                    "time_period": time_period,
+                    "is_holiday": int(is_holiday),
+                    "unit_price": price,
+                    "discount": disc,
+                    "predicted_quantity": float(quantity),
+                    "total_cost": total_cost,
+                })
+    return pd.DataFrame(rows)
+
+
+class ForecastWriter:
+    # Appends forecast chunks to a CSV or Parquet file as they arrive
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+        self._first_chunk = True
+        if path.endswith(".parquet"):
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise SystemExit("Parquet output requires pyarrow (pip install pyarrow).")
+        elif not path.endswith(".csv"):
+            raise SystemExit("Output file must end with .csv or .parquet")
+
+    def write(self, frame):
+        if frame.empty:
+            return
+        if self.path.endswith(".csv"):
+            frame.to_csv(self.path, mode="w" if self._first_chunk else "a", header=self._first_chunk, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        self._first_chunk = False
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def write_ingredient_demand(ingredients, forecasts, path):
+    # One (date x ingredient) rollup per scenario, written in long format
+    frames = []
+    for scenario, rows in forecasts.groupby("scenario", sort=False):
+        demand = ingredients.forecast_demand(rows).stack().rename("quantity").reset_index()
+        demand.columns = ["date", "ingredient", "quantity"]
+        demand.insert(1, "scenario", scenario)
+        frames.append(demand)
+    result = pd.concat(frames, ignore_index=True)
+    result["date"] = result["date"].dt.strftime("%Y-%m-%d")
+    if path.endswith(".parquet"):
+        result.to_parquet(path, index=False)
+    else:
+        result.to_csv(path, index=False)
+    logger.info(f"Wrote ingredient demand for {result['ingredient'].nunique()} ingredients to {path}.")
+
+
+def load_spec(args):
+    spec = {}
+    if args.spec:
+        with open(args.spec, encoding="utf-8") as f:
+            spec = json.load(f)
+    if args.from_date:
+        spec["from_date"] = args.from_date
+    if args.to_date:
+        spec["to_date"] = args.to_date
+    if args.products:
+        spec["products"] = [p.strip() for p in args.products.split(",") if p.strip()]
+    if "from_date" not in spec or "to_date" not in spec:
+        raise SystemExit("A forecast date range is required (--from/--to or from_date/to_date in --spec).")
+    spec.setdefault("scenarios", [DEFAULT_SCENARIO])
+    return spec
+
+
+def load_or_train_model(args):
+    model = PredictionModel()
+    if args.model:
+        if not model.load_model(args.model):
+            raise SystemExit(f"Could not load model from {args.model}")
+        return model
+
+    if args.data_csv:
+        df = pd.read_csv(args.data_csv)
+    else:
+        from Models.Statistic import Statistic
+        df = Statistic().df
+
+    if not model.train_model(df, size_preset=args.size_preset):
+        raise SystemExit("Training failed.")
+    if args.save_model and not model.save_model(args.save_model):
+        raise SystemExit(f"Could not save model to {args.save_model}")
+    return model
+
+
+def run(args):
+    spec = load_spec(args)
+    model = load_or_train_model(args)
+
+    catalog = pd.DataFrame(model.product_catalog)
+    if catalog.empty:
+        raise SystemExit("The model has no product catalog; retrain it to enable batch forecasts.")
+    products = spec.get("products") or catalog["pizza_name"].unique().tolist()
+    shards = [(product, catalog[catalog["pizza_name"] == product].to_dict("records")) for product in products]
+    missing = [product for product, entries in shards if not entries]
+    if missing:
+        logger.warning(f"Skipping products unknown to the model: {missing}")
+    shards = [(product, entries) for product, entries in shards if entries]
+
+    ingredients = None
+    if args.ingredients_output:
+        if "pizza_ingredients" not in catalog.columns:
+            raise SystemExit("The model's product catalog has no ingredient lists; retrain it to roll up ingredients.")
+        ingredients = IngredientMatrix.from_menu(catalog)
+    rollup_parts = []
+
+    start = time.perf_counter()
+    writer = ForecastWriter(args.output)
+    temp_dir = None
+    task_args = ([spec["scenarios"]] * len(shards), [spec["from_date"]] * len(shards),
+                 [spec["to_date"]] * len(shards))
+    try:
+        if args.workers > 1:
+            # Workers load an artifact themselves. A freshly trained model is saved compacted to a
+            # temporary file first: the model object holds locks and the training data.
+            model_path = args.model
+            if model_path is None:
+                temp_dir = tempfile.TemporaryDirectory()
+                model_path = os.path.join(temp_dir.name, "model.joblib")
+                if not model.save_model(model_path, include_estimator=False):
+                    raise SystemExit("Could not write the model artifact for the worker processes.")
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                     initargs=(model_path,)) as executor:
+                for frame in executor.map(_forecast_product, [s[0] for s in shards], [s[1] for s in shards],
+                                          *task_args):
+                    with span("batchforecast.write"):
+                        writer.write(frame)
+                    if ingredients is not None:
+                        rollup_parts.append(frame[["date", "product", "scenario", "predicted_quantity"]])
+        else:
+            _init_worker(None, model)
+            for frame in map(_forecast_product, [s[0] for s in shards], [s[1] for s in shards], *task_args):
+                with span("batchforecast.write"):
+                    writer.write(frame)
+                if ingredients is not None:
+                    rollup_parts.append(frame[["date", "product", "scenario", "predicted_quantity"]])
+    finally:
+        writer.close()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    if ingredients is not None and rollup_parts:
+        write_ingredient_demand(ingredients, pd.concat(rollup_parts, ignore_index=True), args.ingredients_output)
+
+    logger.info(f"Wrote {writer.rows} forecast rows for {len(shards)} products to {args.output} "
+                f"in {time.perf_counter() - start:.2f}s.")
+    if args.timings:
+        # Spans recorded in worker processes are not included
+        print(telemetry.format_summary())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless batch forecasting for pizza sales.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--model", help="Saved model artifact to load.")
+    source.add_argument("--data-csv", help="Train a model from this CSV export of pizza_data.")
+    source.add_argument("--train-db", action="store_true", help="Train a model from the pizza_data table.")
+    parser.add_argument("--save-model", help="Save the trained model artifact to this path.")
+    parser.add_argument("--size-preset", default="full", help="Model size preset used when training.")
+    parser.add_argument("--spec", help="JSON file with from_date, to_date, products and scenarios.")
+    parser.add_argument("--from", dest="from_date", help="First forecast date (YYYY-MM-DD).")
+    parser.add_argument("--to", dest="to_date", help="Last forecast date (YYYY-MM-DD).")
+    parser.add_argument("--products", help="Comma separated product names (default: whole menu).")
+    parser.add_argument("--output", required=True, help="Output file (.csv or .parquet).")
+    parser.add_argument("--ingredients-output", help="Also write forecast ingredient demand (.csv or .parquet).")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to shard products.")
+    parser.add_argument("--log-level", default=None, help="Logging level (default: PIZZA_LOG_LEVEL or INFO).")
+    parser.add_argument("--timings", action="store_true", help="Print the session timing summary at the end.")
+    return parser
+
+
+if __name__ == "__main__":
+    cli_args = build_parser().parse_args(sys.argv[1:])
+    configure_logging(cli_args.log_level)
+    run(cli_args)
@@ -0,0 +1,231 @@
+import argparse
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from Models.PredictionModel import PredictionModel
+from Models.Telemetry import configure_logging, telemetry
+
+# Local JSON forecasting service, e.g.:
+#   python forecastserver.py --model model.joblib --port 5000
+#   curl -X POST localhost:5000/forecast -H "Content-Type: application/json" \
+#       -d '{"product": "The Hawaiian Pizza", "pizza_size": 1, "pizza_category": 1, "unit_price": 13.25,
+#            "from_date": "2016-01-01", "to_date": "2016-01-31"}'
+
+TIME_PERIODS = ("Morning", "Afternoon", "Evening")
+
+
+class PredictionBatcher:
+    # Collects feature matrices from concurrent requests for up to `window` seconds
+    # and evaluates them with a single forest prediction.
+    def __init__(self, predict_fn, window=0.005, max_rows=100000):
+        self.predict_fn = predict_fn
+        self.window = window
+        self.max_rows = max_rows
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, X, timeout=30):
+        future = Future()
+        self._queue.put((X, future))
+        return future.result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            rows = len(items[0][0])
+            deadline = time.monotonic() + self.window
+            while rows < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                items.append(item)
+                rows += len(item[0])
+
+            try:
+                out = self.predict_fn(np.concatenate([X for X, _ in items]))
+                bounds = np.cumsum([len(X) for X, _ in items])[:-1]
+                for (_, future), part in zip(items, np.split(out, bounds)):
+                    future.set_result(part)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+            self.batches += 1
+            self.requests += len(items)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+            "window_ms": self.window * 1000,
+        }
+
+
+class LatencyTracker:
+    def __init__(self, maxlen=10000):
+        self._samples = {}
+        self._maxlen = maxlen
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self._maxlen)).append(seconds)
+
+    def summary(self):
+        with self._lock:
+            samples = {endpoint: np.array(values) for endpoint, values in self._samples.items()}
+        return {
+            endpoint: {
+                "count": len(values),
+                "p50_ms": float(np.percentile(values, 50) * 1000),
+                "p99_ms": float(np.percentile(values, 99) * 1000),
+            }
+            for endpoint, values in samples.items() if len(values)
+        }
+
+
+def validate_forecast_inputs(model, product, pizza_category, pizza_size, time_period):
+    # The model maps unseen labels to its first class; the service rejects them instead.
+    # Returns (message, status) or None.
+    encoders = model.label_encoders
+    if "pizza_name" not in encoders:
+        return "Model is not trained.", 503
+    if product not in encoders["pizza_name"].classes_:
+        return f"Unknown product: {product!r}", 404
+    for name, value in (("pizza_size", pizza_size), ("pizza_category", pizza_category)):
+        if name in encoders and str(value) not in encoders[name].classes_:
+            return f"Unknown {name}: {value!r} (known: {encoders[name].classes_.tolist()})", 400
+    if time_period not in TIME_PERIODS:
+        return f"Unknown time_period: {time_period!r} (known: {list(TIME_PERIODS)})", 400
+    if model.product_catalog and not any(e["pizza_name"] == product and str(e["pizza_size"]) == str(pizza_size)
+                                         for e in model.product_catalog):
+        return f"Product {product!r} has no size {pizza_size!r} on the menu.", 404
+    return None
+
+
+def create_app(model, statistic=None, window=0.005):
+    app = Flask(__name__)
+    batcher = PredictionBatcher(model._predict_matrix_cached, window=window)
+    latency = LatencyTracker()
+
+    @app.before_request
+    def start_timer():
+        request.start_time = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        latency.record(request.path, time.perf_counter() - request.start_time)
+        return response
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok", "model_version": model.model_version})
+
+    @app.post("/forecast")
+    def forecast():
+        body = request.get_json(silent=True) or {}
+        missing = [key for key in ("product", "from_date", "to_date") if key not in body]
+        if missing:
+            return jsonify({"error": f"Missing fields: {missing}"}), 400
+
+        # Size, category and price default to the product's catalog entry
+        entry = next((e for e in model.product_catalog if e["pizza_name"] == body["product"]), {})
+        inputs = {"pizza_category": body.get("pizza_category", entry.get("pizza_category")),
+                  "pizza_size": body.get("pizza_size", entry.get("pizza_size")),
+                  "time_period": body.get("time_period", "Evening")}
+        error = validate_forecast_inputs(model, body["product"], **inputs)
+        if error is not None:
+            return jsonify({"error": error[0]}), error[1]
+        try:
+            encoded = model.encode_prediction_inputs(
+                body["product"], inputs["time_period"], bool(body.get("is_holiday", False)),
+                inputs["pizza_category"], inputs["pizza_size"],
+                body.get("unit_price", entry.get("unit_price", 0.0)), body.get("discount", 0.0),
+                body["from_date"], body["to_date"]
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        if encoded is None:
+            return jsonify({"error": "Model is not trained."}), 503
+        date_range, input_data, total_cost = encoded
+
+        quantities = np.maximum(0, batcher.predict(input_data))
+        return jsonify({
+            "product": body["product"],
+            "model_version": model.model_version,
+            "forecasts": [
+                {"date": date.strftime("%Y-%m-%d"), "predicted_quantity": float(quantity), "total_cost": total_cost}
+                for date, quantity in zip(date_range, quantities)
+            ],
+        })
+
+    @app.get("/statistics")
+    def statistics():
+        if statistic is None:
+            return jsonify({"error": "Statistics are disabled; start the server with --statistics."}), 503
+        product = request.args.get("product")
+        from_date = request.args.get("from_date")
+        to_date = request.args.get("to_date")
+        resolution = request.args.get("resolution", "day")
+        if not product or not from_date or not to_date:
+            return jsonify({"error": "product, from_date and to_date are required."}), 400
+        try:
+            dates, revenues, costs, quantities = statistic.get_data_in_range(product, from_date, to_date, resolution)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"product": product, "resolution": resolution, "dates": dates, "revenues": revenues,
+                        "costs": costs, "quantities": quantities})
+
+    @app.get("/metrics")
+    def metrics():
+        return jsonify({
+            "latency": latency.summary(),
+            "batching": batcher.stats(),
+            "prediction_cache": model.get_cache_stats(),
+            "timings": telemetry.summary(),
+            "model": {k: v for k, v in model.get_metrics().items() if k != "folds"},
+        })
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP forecasting service.")
+    parser.add_argument("--model", required=True, help="Saved model artifact to serve.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--batch-window-ms", type=float, default=5.0,
+                        help="How long concurrent forecast requests are collected into one batch.")
+    parser.add_argument("--statistics", action="store_true",
+                        help="Load pizza_data from the database to serve /statistics.")
+    parser.add_argument("--log-level", default=None, help="Logging level (default: PIZZA_LOG_LEVEL or INFO).")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    model = PredictionModel()
+    if not model.load_model(args.model):
+        raise SystemExit(f"Could not load model from {args.model}")
+    statistic = None
+    if args.statistics:
+        from Models.Statistic import Statistic
+        statistic = Statistic()
+
+    app = create_app(model, statistic, window=args.batch_window_ms / 1000)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,94 @@
+import argparse
+import os
+
+import joblib
 import pandas as pd
-import pymysql
 
-# Đọc file CSV
-file_path = "./Data/Pizza_Cleaned.csv"
-df = pd.read_csv(file_path)
+from Connectors.Backend import create_backend, numpy_schema, select_sql
+from Connectors.NormalizedSchema import check_round_trip, resolve_pizza_keys, to_sales_frame
+from Models.PredictionModel import PredictionModel
+
+# Nạp dữ liệu CSV vào MySQL (mặc định) hoặc một database cục bộ, ví dụ:
+#   python ingestdata.py
+#   python ingestdata.py --backend duckdb --db-path ./Data/pizzamanager.duckdb \
+#       --admin-account admin --admin-password 123
+#   python ingestdata.py --backend duckdb --normalized   # bảng pizza + pizza_sales
+#   python ingestdata.py --csv new_orders.csv --drift-model model.joblib   # kiểm tra drift so với dữ liệu huấn luyện
+
 
-# Thông tin kết nối MySQL
-db_config = {
-    "host": "localhost",
-    "port": 3306,
-    "user": "root",
-    "password": "123456",
-    "database": "pizzamanager"
-}
+def update_drift_state(df, model_path, state_path):
+    # The monitor state accumulates every batch ingested since the model was (re)trained
+    model = PredictionModel()
+    if not model.load_model(model_path):
+        print(f"Không thể tải mô hình {model_path}; bỏ qua kiểm tra drift.")
+        return
+    monitor = joblib.load(state_path) if os.path.exists(state_path) else None
+    if monitor is None or monitor.model_version != model.model_version:
+        monitor = model.create_drift_monitor()
+        if monitor is None:
+            return
+    monitor.update(*model.drift_features(df))
+    joblib.dump(monitor, state_path)
 
-conn = None
-cursor = None
+    report = monitor.report()
+    print(f"Drift so với dữ liệu huấn luyện ({report['rows']} dòng mới):")
+    for col, score in report["scores"].items():
+        flag = " *" if col in report["drifted"] else ""
+        print(f"  {col:<16} PSI={score['psi']:.3f}  KS={score['ks']:.3f}{flag}")
+    print("Cần huấn luyện lại mô hình." if report["retrain"] else "Chưa cần huấn luyện lại mô hình.")
+
+
+parser = argparse.ArgumentParser(description="Load the pizza sales CSV into the pizza_data table.")
+parser.add_argument("--csv", default="./Data/Pizza_Cleaned.csv")
+parser.add_argument("--backend", default=None, help="mysql, sqlite or duckdb (default: PIZZA_DB_BACKEND or mysql).")
+parser.add_argument("--db-path", default=None, help="Database file for sqlite/duckdb (default: PIZZA_DB_PATH).")
+parser.add_argument("--admin-account", help="Also create an admin login (e.g. for a fresh local database).")
+parser.add_argument("--admin-password")
+parser.add_argument("--normalized", action="store_true",
+                    help="Load into the pizza dimension and the compact pizza_sales fact table instead of pizza_data.")
+parser.add_argument("--drift-model", help="Saved model (joblib) to compare the new rows against for data drift.")
+parser.add_argument("--drift-state", help="File accumulating drift sketches between runs "
+                                          "(default: <drift-model>.drift).")
+args = parser.parse_args()
+
+# Đọc file CSV
+df = pd.read_csv(args.csv)
+
+backend = create_backend(args.backend, path=args.db_path)
 
 try:
-    conn = pymysql.connect(**db_config)
-    cursor = conn.cursor()
-
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS pizza_data (
-        order_id INT,
-        pizza_id VARCHAR(255),
-        quantity INT,
-        order_date DATE,
-        order_time TIME,
-        unit_price FLOAT,
-        discount FLOAT,
-        total_price FLOAT,
-        pizza_size INT,
-        pizza_category INT,
-        pizza_ingredients TEXT,
-        pizza_name VARCHAR(255),
-        total_cost FLOAT,
-        is_holiday INT,
-        time_period INT
-    );
-    """
-    cursor.execute(create_table_query)
-    conn.commit()
-
-    insert_query = """
-    INSERT INTO pizza_data (order_id, pizza_id, quantity, order_date, order_time, unit_price, discount, total_price,
-                            pizza_size, pizza_category, pizza_ingredients, pizza_name, total_cost, 
-                            is_holiday, time_period)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-    """
-
-    data = [tuple(row) for row in df.itertuples(index=False, name=None)]
-    cursor.executemany(insert_query, data)
-    conn.commit()
-
-    print("Dữ liệu đã được nạp thành công vào MySQL!")
+    backend.connect()
+
+    if args.normalized:
+        backend.create_table("pizza")
+        backend.create_table("pizza_sales")
+        # Menu items already in `pizza` keep their keys; only new ones are inserted
+        schema = numpy_schema("pizza")
+        dimension = pd.DataFrame(backend.fetch_arrays(select_sql("pizza", schema), schema))
+        full, new_items, keys = resolve_pizza_keys(df, dimension)
+        sales = to_sales_frame(df, keys)
+        check_round_trip(df, sales, full)
+        backend.load_frame("pizza", new_items)
+        backend.load_frame("pizza_sales", sales)
+    else:
+        backend.create_table("pizza_data")
+        backend.load_frame("pizza_data", df)
+
+    if args.admin_account:
+        backend.create_table("admin")
+        backend.execute(
+            "INSERT INTO admin (AdminID, AdminFullName, AdminAccount, AdminPassword, AdminPhone) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (1, args.admin_account, args.admin_account, args.admin_password or "", "")
+        )
+
+    print(f"Dữ liệu đã được nạp thành công vào {backend.name}!")
+
+    if args.drift_model:
+        update_drift_state(df, args.drift_model, args.drift_state or f"{args.drift_model}.drift")
 
 except Exception as err:
     print(f"Lỗi khi kết nối hoặc ghi dữ liệu: {err}")
 
 finally:
-    if cursor:
-        cursor.close()
-    if conn:
-        conn.close()
+    backend.close()
@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+from Connectors.Backend import DEFAULT_CHUNK_ROWS
+from Models.StreamingProfile import csv_chunks, profile_chunks
+from Models.Telemetry import configure_logging, get_logger, telemetry
+
+logger = get_logger("profiledata")
+
+# One-pass profile of pizza_data (or a CSV export) in constant memory, e.g.:
+#   python profiledata.py --csv ./Data/Pizza_Cleaned.csv
+#   python profiledata.py --backend duckdb --db-path ./Data/pizzamanager.duckdb --workers 8 --output profile.json
+
+
+def run(args):
+    if args.csv:
+        profile = profile_chunks(csv_chunks(args.csv, args.chunk_size), n_jobs=args.workers)
+    else:
+        from Models.Statistic import Statistic
+        statistic = Statistic(autoload=False, table_name=args.table, backend=args.backend, path=args.db_path)
+        profile = statistic.profile_table(chunk_size=args.chunk_size, n_jobs=args.workers)
+        if profile is None:
+            raise SystemExit(f"Could not profile table {statistic.table_name}.")
+
+    with pd.option_context("display.width", 120, "display.max_columns", 20):
+        print(f"Rows: {profile.rows}")
+        print(profile.summary())
+        print("Correlation with quantity:")
+        print(profile.correlations()["quantity"])
+        for description, count in profile.anomalies.items():
+            if count:
+                print(f"{count} rows with {description}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(profile.to_dict(), f, indent=2, default=str)
+        logger.info(f"Wrote profile to {args.output}.")
+    if args.timings:
+        print(telemetry.format_summary())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Streaming statistics over pizza sales data.")
+    parser.add_argument("--csv", help="Profile this CSV export instead of the database.")
+    parser.add_argument("--backend", default=None, help="mysql, sqlite or duckdb (default: PIZZA_DB_BACKEND or mysql).")
+    parser.add_argument("--db-path", default=None, help="Database file for sqlite/duckdb (default: PIZZA_DB_PATH).")
+    parser.add_argument("--table", default=None, help="pizza_data or pizza_sales (default: PIZZA_DB_TABLE).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows read per chunk.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes profiling chunks (1: in process).")
+    parser.add_argument("--output", help="Also write the full profile as JSON.")
+    parser.add_argument("--log-level", default=None, help="Logging level (default: PIZZA_LOG_LEVEL or INFO).")
+    parser.add_argument("--timings", action="store_true", help="Print the session timing summary at the end.")
+    return parser
+
+
+if __name__ == "__main__":
+    cli_args = build_parser().parse_args(sys.argv[1:])
+    configure_logging(cli_args.log_level)
+    run(cli_args)
@@ -0,0 +1,69 @@
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+from Models.PredictionModel import PredictionModel
+from Models.Telemetry import configure_logging, get_logger, telemetry
+
+logger = get_logger("tunemodel")
+
+# Headless hyperparameter search (e.g. an overnight job); the refitted best model is saved
+# with the leaderboard in its artifact:
+#   python tunemodel.py --data-csv ./Data/Pizza_Cleaned.csv --save-model model.joblib --time-budget 28800
+#   python tunemodel.py --train-db --save-model model.joblib --n-iter 50 --workers 8 \
+#       --leaderboard-output leaderboard.json
+
+
+def load_data(args):
+    if args.data_csv:
+        return pd.read_csv(args.data_csv)
+    from Models.Statistic import Statistic
+    return Statistic().df
+
+
+def run(args):
+    param_space = None
+    if args.param_space:
+        with open(args.param_space, encoding="utf-8") as f:
+            param_space = json.load(f)
+
+    model = PredictionModel()
+    leaderboard = model.search_hyperparameters(load_data(args), param_space=param_space, n_iter=args.n_iter,
+                                               time_budget=args.time_budget, n_splits=args.n_splits,
+                                               n_jobs=args.workers, leaderboard_path=args.leaderboard_output,
+                                               random_state=args.seed)
+    if not leaderboard:
+        raise SystemExit("Hyperparameter search produced no results.")
+    if not model.save_model(args.save_model):
+        raise SystemExit(f"Could not save model to {args.save_model}")
+    best = leaderboard[0]
+    print(f"Best of {len(leaderboard)} candidates: MAE {best['MAE']:.4f}, RMSE {best['RMSE']:.4f}, "
+          f"params {best['params']}")
+    if args.timings:
+        print(telemetry.format_summary())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless hyperparameter search for the quantity model.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data-csv", help="Search on this CSV export of pizza_data.")
+    source.add_argument("--train-db", action="store_true", help="Search on the pizza_data table.")
+    parser.add_argument("--save-model", required=True, help="Save the refitted best model (with leaderboard) here.")
+    parser.add_argument("--n-iter", type=int, default=20, help="Number of sampled parameter sets.")
+    parser.add_argument("--time-budget", type=float, default=None, help="Stop queueing candidates after N seconds.")
+    parser.add_argument("--n-splits", type=int, default=3, help="Rolling-origin folds per candidate.")
+    parser.add_argument("--param-space", help="JSON file mapping RandomForest parameters to candidate values.")
+    parser.add_argument("--leaderboard-output", help="Also keep the leaderboard up to date in this JSON file.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes fitting candidates.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default=None, help="Logging level (default: PIZZA_LOG_LEVEL or INFO).")
+    parser.add_argument("--timings", action="store_true", help="Print the session timing summary at the end.")
+    return parser
+
+
+if __name__ == "__main__":
+    cli_args = build_parser().parse_args(sys.argv[1:])
+    configure_logging(cli_args.log_level)
+    run(cli_args)